@@ -96,6 +96,46 @@ DATABASES = {
     }
 }
 
+# Response caching, ETags and the preference snapshot are invalidated through version stamps in the
+# 'versions' cache, so it has to be shared by every worker (run `manage.py createcachetable` once).
+# With a local-memory or dummy cache they are switched off. The stamps are a few dozen keys kept
+# apart from the cached responses, so culling a full 'default' never evicts them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'kolo_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+            'CULL_FREQUENCY': 4,
+        },
+    },
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'kolo_versions',
+        'TIMEOUT': None,
+    },
+}
+
+RESPONSE_CACHE_TIMEOUT = 600
+
+# Seconds a worker keeps serving in-memory snapshots (the permission catalogue) before it checks
+# their version stamps again, i.e. how late a change made by another worker may be seen.
+VERSION_CHECK_INTERVAL = 5
+
+RENTAL_DOCUMENT_WORKERS = 2
+
+# Thumbnails generated in the background for every Gallery image, by name: (geometry, sorl options).
+GALLERY_THUMBNAILS = {
+    'thumbnail': ('512x512', {'crop': 'center'}),
+}
+
+THUMBNAIL_WORKERS = 2
+
+# Responsive variants of gallery images, avatars and sponsor logos; formats Pillow cannot write are skipped.
+IMAGE_VARIANT_WIDTHS = (320, 640, 1024, 1600)
+IMAGE_VARIANT_FORMATS = ('avif', 'webp')
+IMAGE_VARIANT_QUALITY = {'avif': 60, 'webp': 80}
+
 # Password validation
 # https://docs.djangoproject.com/en/2.0/ref/settings/#auth-password-validators
 
@@ -173,8 +213,24 @@ MEDIA_URL = 'media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, "mediafolder")
 
+# Uploads are stored once per content hash under MEDIA_ROOT/blobs/. sorl names its thumbnails itself,
+# so they stay on plain file system storage.
+DEFAULT_FILE_STORAGE = 'RESTApi.storage.ContentAddressedStorage'
+THUMBNAIL_STORAGE = 'django.core.files.storage.FileSystemStorage'
+
+# Chunked uploads are staged outside MEDIA_ROOT until they are finalized; clear_upload_sessions
+# removes sessions idle for longer than UPLOAD_SESSION_MAX_AGE.
+UPLOAD_SESSION_ROOT = os.path.join(BASE_DIR, "uploadfolder")
+UPLOAD_SESSION_MAX_SIZE = 1024 * 1024 * 1024
+UPLOAD_SESSION_MAX_AGE = datetime.timedelta(days=1)
+
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfolder")
 
+# Serve MEDIA_ROOT and STATIC_ROOT from Django, with precompressed assets and immutable blobs. Off
+# outside DEBUG, like the static() helper it replaces: in production the web server in front of the
+# app serves these directories. Set it to True to let Django serve them anyway.
+SERVE_FILES = DEBUG
+
 """STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "staticfolder")
 ]"""
@@ -24,7 +24,6 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
     TokenVerifyView,
 )
-from django.conf.urls.static import static
 
 from RESTApi.views import IndexTemplateView
 from . import settings
@@ -70,6 +69,7 @@ urlpatterns = [
     url(r'^api/groups/(?P<pk>\d+)/$', views.GroupViewSetDetail.as_view(), name='group_detail'),
     url(r'^api/articles/$', views.ArticleViewSetList.as_view(), name='article_list'),
     url(r'^api/articles/(?P<pk>\d+)/$', views.ArticleViewSetDetail.as_view(), name='article_list'),
+    url(r'^api/articles/(?P<pk>\d+)/comments/$', views.ArticleCommentsView.as_view(), name='article_comments'),
     url(r'^api/comments/$', views.CommentViewSetList.as_view(), name='comment_list'),
     url(r'^api/comments/(?P<pk>\d+)/$', views.CommentViewSetDetail.as_view(), name='comment_detail'),
     url(r'^api/tags/$', views.TagViewSetList.as_view(), name='tag_list'),
@@ -79,6 +79,7 @@ urlpatterns = [
     url(r'^api/gallery/$', views.GalleryViewSetList.as_view(), name='gallery_detail'),
     url(r'^api/gallery/(?P<pk>\d+)/$', views.GalleryViewSetDetail.as_view(), name='gallery_detail'),
     url(r'^api/hardware_rentals/$', views.HardwareRentalViewSetList.as_view(), name='hardware_rental_list'),
+    url(r'^api/hardware_rentals/export/$', views.HardwareRentalExportView.as_view(), name='hardware_rental_export'),
     url(r'^api/hardware_rentals/(?P<pk>\d+)/$', views.HardwareRentalViewSetDetail.as_view(), name='hardware_rental_detail'),
     url(r'^api/hardwares/$', views.HardwareViewSetList.as_view(), name='hardware_list'),
     url(r'^api/hardwares/(?P<pk>\d+)/$', views.HardwareViewSetDetail.as_view(), name='hardware_detail'),
@@ -94,5 +95,21 @@ urlpatterns = [
     url(r'^api/generic_links/(?P<pk>\d+)/$', views.GenericLinkViewSetDetail.as_view(), name='generic_link_list'),
     url(r'^api/footer_links/$', views.FooterLinkListView.as_view(), name='footer_link_detail'),
     url(r'^api/footer_links/(?P<pk>\d+)/$', views.FooterLinkDetailView.as_view(), name='footer_link_list'),
+    url(r'^api/uploads/$', views.UploadSessionListView.as_view(), name='upload_session_list'),
+    url(r'^api/uploads/(?P<pk>[0-9a-f-]+)/$', views.UploadSessionDetailView.as_view(), name='upload_session_detail'),
+    url(r'^api/uploads/(?P<pk>[0-9a-f-]+)/complete/$', views.UploadSessionCompleteView.as_view(),
+        name='upload_session_complete'),
+    url(r'^api/bootstrap/$', views.BootstrapView.as_view(), name='bootstrap'),
+    url(r'^api/search/$', views.SearchView.as_view(), name='search'),
+    url(r'^api/cache_stats/$', views.ResponseCacheStatsView.as_view(), name='response_cache_stats'),
     url(r'^docs$', schema_view),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+
+if settings.SERVE_FILES:
+    urlpatterns += [
+        url(r'^%sblobs/(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), views.BlobView.as_view(), name='blob'),
+        url(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'),
+            views.StaticFileView.as_view(document_root=settings.MEDIA_ROOT), name='media'),
+        url(r'^%s(?P<path>.+)$' % settings.STATIC_URL.lstrip('/'),
+            views.StaticFileView.as_view(document_root=settings.STATIC_ROOT), name='static'),
+    ]
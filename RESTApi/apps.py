@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class RestapiConfig(AppConfig):
     name = 'RESTApi'
+
+    def ready(self):
+        from . import availability, image_processing, permission_catalogue, preferences, resource_versions, search, \
+            uploads  # noqa: F401
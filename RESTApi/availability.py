@@ -0,0 +1,120 @@
+import time
+
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Hardware, HardwareRental
+
+
+class HardwareUnavailable(Exception):
+    pass
+
+
+class HardwareBusy(Exception):
+    pass
+
+
+def active_rentals():
+    return HardwareRental.objects.filter(returned_date__isnull=True)
+
+
+def available_hardware():
+    return Hardware.objects.filter(status=Hardware.AVAILABLE)
+
+
+# SQLite cannot lock rows, so concurrent bookings may fail with 'database is locked' instead of
+# waiting; they are retried a few times and then reported as busy so the client can try again.
+RESERVE_ATTEMPTS = 3
+RESERVE_BACKOFF = 0.05
+RESERVE_RETRY_AFTER = 1
+
+
+def _book(hardware, operation):
+    for attempt in range(RESERVE_ATTEMPTS):
+        try:
+            return operation()
+        except OperationalError:
+            if attempt + 1 == RESERVE_ATTEMPTS:
+                raise HardwareBusy(hardware)
+            time.sleep(RESERVE_BACKOFF * (attempt + 1))
+
+
+def _lock_available(hardware):
+    hardware = Hardware.objects.select_for_update().get(pk=hardware.pk)
+    if hardware.status != Hardware.AVAILABLE:
+        raise HardwareUnavailable(hardware)
+    return hardware
+
+
+def reserve(hardware, **fields):
+    # The hardware row lock serialises concurrent reservations; the unique constraint on active
+    # rentals still holds where the database cannot lock rows (SQLite).
+    def create():
+        with transaction.atomic():
+            locked = _lock_available(hardware)
+            try:
+                with transaction.atomic():
+                    return HardwareRental.objects.create(hardware=locked, **fields)
+            except IntegrityError:
+                raise HardwareUnavailable(locked)
+    return _book(hardware, create)
+
+
+def save_rental(serializer):
+    # Moving an active rental to other hardware, or reopening a returned one, books that hardware
+    # the way reserve() does.
+    rental = serializer.instance
+    hardware = serializer.validated_data.get('hardware', rental.hardware)
+    returned_date = serializer.validated_data.get('returned_date', rental.returned_date)
+    books = returned_date is None and (hardware.pk != rental.hardware_id or rental.returned_date is not None)
+
+    def save():
+        with transaction.atomic():
+            if books:
+                _lock_available(hardware)
+            try:
+                with transaction.atomic():
+                    return serializer.save()
+            except IntegrityError:
+                raise HardwareUnavailable(hardware)
+    return _book(hardware, save)
+
+
+def sync_status(hardware_id):
+    # Rented while a rental is active, Available again once it is returned; Unavailable is left to admins.
+    with transaction.atomic():
+        try:
+            hardware = Hardware.objects.select_for_update().get(pk=hardware_id)
+        except Hardware.DoesNotExist:
+            return
+        if active_rentals().filter(hardware_id=hardware_id).exists():
+            status = Hardware.RENTED
+        elif hardware.status == Hardware.RENTED:
+            status = Hardware.AVAILABLE
+        else:
+            return
+        if hardware.status != status:
+            hardware.status = status
+            hardware.save(update_fields=['status'])
+
+
+@receiver(pre_save, sender=HardwareRental)
+def remember_hardware(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is not None and (update_fields is None or 'hardware' in update_fields):
+        instance._stored_hardware_id = sender.objects.filter(pk=instance.pk).values_list('hardware_id', flat=True).first()
+
+
+@receiver(post_save, sender=HardwareRental)
+def rental_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'hardware', 'returned_date'} & set(update_fields):
+        sync_status(instance.hardware_id)
+    # A rental moved to other hardware frees the one it left.
+    previous = instance.__dict__.pop('_stored_hardware_id', None)
+    if previous is not None and previous != instance.hardware_id:
+        sync_status(previous)
+
+
+@receiver(post_delete, sender=HardwareRental)
+def rental_deleted(sender, instance, **kwargs):
+    sync_status(instance.hardware_id)
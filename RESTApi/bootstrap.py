@@ -0,0 +1,40 @@
+from collections import OrderedDict
+
+from .models import Article, FooterLink, Project, Section, Sponsor
+from .preferences import get_preferences
+from .query_plans import eager_load
+from .serializers import ArticleSerializer, FooterLinkSerializer, ProjectSerializer, SectionSerializer, \
+    SponsorSerializer
+
+# Everything the frontend needs before it can draw the first page, in the order it is rendered.
+# The querysets match the list endpoints they replace, so the payload reads the same.
+BOOTSTRAP_LISTS = (
+    ('section', lambda: Section.objects.all(), SectionSerializer),
+    ('sponsors', lambda: Sponsor.objects.all(), SponsorSerializer),
+    ('footer_links', lambda: FooterLink.objects.all(), FooterLinkSerializer),
+)
+
+# Latest entries shown on the homepage; the page size comes from general__default_items_on_page.
+BOOTSTRAP_LATEST = (
+    ('articles', lambda: Article.objects.order_by('-publication_date', '-id'), ArticleSerializer),
+    ('projects', lambda: Project.objects.order_by('-id'), ProjectSerializer),
+)
+
+# Global preferences are admin-only at /api/preferences/global/; anonymous pages get just these.
+PUBLIC_PREFERENCES = (
+    'general__title',
+    'general__default_items_on_page',
+    'general__default_page_color',
+)
+
+
+def build_payload():
+    preferences = get_preferences()
+    limit = preferences['general__default_items_on_page']
+    payload = OrderedDict()
+    for name, queryset, serializer_class in BOOTSTRAP_LISTS:
+        payload[name] = serializer_class(eager_load(queryset(), serializer_class), many=True).data
+    payload['preferences'] = OrderedDict((key, preferences[key]) for key in PUBLIC_PREFERENCES)
+    for name, queryset, serializer_class in BOOTSTRAP_LATEST:
+        payload[name] = serializer_class(eager_load(queryset(), serializer_class)[:limit], many=True).data
+    return payload
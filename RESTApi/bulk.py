@@ -0,0 +1,185 @@
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
+from django.db.models import prefetch_related_objects
+from rest_framework import serializers, status
+from rest_framework.response import Response
+
+from .signals import bulk_saved
+
+MAX_BULK_ITEMS = 1000
+
+
+def _split(model, attrs):
+    fields, many_to_many = {}, {}
+    for name, value in attrs.items():
+        if model._meta.get_field(name).many_to_many:
+            many_to_many[name] = value
+        else:
+            fields[name] = value
+    return fields, many_to_many
+
+
+def _bulk_create(model, instances):
+    using = router.db_for_write(model)
+    features = connections[using].features
+    # Django 3.0 renamed can_return_ids_from_bulk_insert.
+    if getattr(features, 'can_return_rows_from_bulk_insert', None) \
+            or getattr(features, 'can_return_ids_from_bulk_insert', False):
+        model._default_manager.bulk_create(instances)
+        return
+    if connections[using].vendor != 'sqlite':
+        for instance in instances:
+            instance.save(force_insert=True)
+        return
+    # SQLite cannot return the new ids, but the transaction holds the database write lock and ids
+    # only grow, so the rows just inserted are the newest ones.
+    model._default_manager.bulk_create(instances)
+    pks = model._default_manager.order_by('-pk').values_list('pk', flat=True)[:len(instances)]
+    for instance, pk in zip(instances, reversed(list(pks))):
+        instance.pk = pk
+
+
+def _set_many_to_many(model, instances, values):
+    # Replaces the related sets of every instance that was given one, one delete and one insert per field.
+    for name in {name for items in values for name in items}:
+        field = model._meta.get_field(name)
+        through = field.remote_field.through
+        source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+        owners = [(instance, items[name]) for instance, items in zip(instances, values) if name in items]
+        through._default_manager.filter(**{f'{source}__in': [instance.pk for instance, _ in owners]}).delete()
+        through._default_manager.bulk_create([
+            through(**{f'{source}_id': instance.pk, f'{target}_id': related_pk})
+            for instance, related in owners
+            for related_pk in dict.fromkeys(item.pk for item in related)
+        ])
+
+
+class _Preloaded:
+    # Stands in for the queryset of a related field while a bulk request is validated, so every
+    # referenced object is loaded by one pk__in query instead of one query per item.
+    def __init__(self, queryset, pks):
+        self.model = queryset.model
+        self.objects = queryset.in_bulk(pks)
+
+    def get(self, pk):
+        try:
+            pk = self.model._meta.pk.to_python(pk)
+        except ValidationError:
+            raise ValueError(pk)
+        try:
+            return self.objects[pk]
+        except KeyError:
+            raise self.model.DoesNotExist
+
+
+def _valid_pks(model, values):
+    pks = set()
+    for value in values:
+        try:
+            pks.add(model._meta.pk.to_python(value))
+        except (TypeError, ValidationError):
+            pass
+    pks.discard(None)
+    return pks
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    def relation_fields(self):
+        for name, field in self.child.fields.items():
+            many = isinstance(field, serializers.ManyRelatedField)
+            relation = field.child_relation if many else field
+            if not field.read_only and isinstance(relation, serializers.PrimaryKeyRelatedField) \
+                    and relation.pk_field is None:
+                yield name, many, relation
+
+    def to_internal_value(self, data):
+        replaced = []
+        if isinstance(data, list):
+            for name, many, relation in self.relation_fields():
+                values = []
+                for item in data:
+                    value = item.get(name) if isinstance(item, dict) else None
+                    values.extend(value if many and isinstance(value, list) else [value])
+                queryset = relation.get_queryset()
+                replaced.append((relation, relation.queryset))
+                relation.queryset = _Preloaded(queryset, _valid_pks(queryset.model, values))
+        try:
+            return super().to_internal_value(data)
+        finally:
+            for relation, queryset in replaced:
+                relation.queryset = queryset
+
+    def prefetch(self, instances):
+        model = self.child.Meta.model
+        names = [field.name for field in model._meta.many_to_many if field.name in self.child.fields]
+        prefetch_related_objects(instances, *names)
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        rows = [_split(model, attrs) for attrs in validated_data]
+        instances = [model(**fields) for fields, _ in rows]
+        with transaction.atomic():
+            _bulk_create(model, instances)
+            _set_many_to_many(model, instances, [many_to_many for _, many_to_many in rows])
+            bulk_saved.send(sender=model, instances=instances, created=True)
+        self.prefetch(instances)
+        return instances
+
+    def update(self, instances, validated_data):
+        model = self.child.Meta.model
+        changed, many_to_many = set(), []
+        for instance, attrs in zip(instances, validated_data):
+            fields, related = _split(model, attrs)
+            for name, value in fields.items():
+                setattr(instance, name, value)
+            changed.update(fields)
+            many_to_many.append(related)
+        with transaction.atomic():
+            if changed:
+                model._default_manager.bulk_update(instances, sorted(changed))
+            _set_many_to_many(model, instances, many_to_many)
+            bulk_saved.send(sender=model, instances=instances, created=False)
+        self.prefetch(instances)
+        return instances
+
+
+def _check_items(data):
+    if not isinstance(data, list) or not data:
+        return 'Expected a non-empty list of objects'
+    if len(data) > MAX_BULK_ITEMS:
+        return 'At most %d objects can be written at once' % MAX_BULK_ITEMS
+    if not all(isinstance(item, dict) for item in data):
+        return 'Expected a non-empty list of objects'
+
+
+def bulk_create(request, serializer_class):
+    error = _check_items(request.data)
+    if error:
+        return Response({'non_field_errors': [error]}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = serializer_class(data=request.data, many=True)
+    if serializer.is_valid():
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+def bulk_update(request, queryset, serializer_class):
+    # Partial updates of the objects named by the "id" of each item, all or nothing.
+    error = _check_items(request.data)
+    if error:
+        return Response({'non_field_errors': [error]}, status=status.HTTP_400_BAD_REQUEST)
+    ids = [item.get('id') for item in request.data]
+    found = queryset.in_bulk([pk for pk in ids if isinstance(pk, int)])
+    errors = [{} for _ in ids]
+    for index, pk in enumerate(ids):
+        if pk not in found:
+            errors[index] = {'id': ['No object with this id']}
+        elif ids.index(pk) != index:
+            errors[index] = {'id': ['Listed more than once']}
+    if any(errors):
+        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+    serializer = serializer_class([found[pk] for pk in ids], data=request.data, many=True, partial=True)
+    if serializer.is_valid():
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
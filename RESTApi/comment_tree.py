@@ -0,0 +1,39 @@
+from collections import defaultdict
+
+from .models import Comment
+
+COMMENT_TREE_MAX_DEPTH = 5
+COMMENT_TREE_MAX_REPLIES = 20
+
+
+def load_thread(article_id, queryset=None):
+    if queryset is None:
+        queryset = Comment.objects.all()
+    return list(queryset.filter(root_article=article_id).order_by('-creation_date'))
+
+
+def build_comment_tree(comments):
+    children = defaultdict(list)
+    for comment in comments:
+        children[comment.parent_id].append(comment)
+    for comment in comments:
+        comment.replies = children.get(comment.pk, [])
+    return children[None]
+
+
+def _bounded_int(value, default, maximum):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(value, maximum))
+
+
+def tree_context(request):
+    return {
+        'depth': 1,
+        'max_depth': _bounded_int(request.query_params.get('depth'),
+                                  COMMENT_TREE_MAX_DEPTH, COMMENT_TREE_MAX_DEPTH),
+        'max_replies': _bounded_int(request.query_params.get('replies'),
+                                    COMMENT_TREE_MAX_REPLIES, COMMENT_TREE_MAX_REPLIES),
+    }
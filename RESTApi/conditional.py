@@ -0,0 +1,51 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .resource_versions import get_version, versions_are_shared
+
+
+class NotModified(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def resource_validators(resource, request, renderer_format, user_id=''):
+    version = get_version(resource)
+    raw = f'{resource}:{version}:{request.get_full_path()}:{renderer_format}:{user_id}'
+    return '"%s"' % hashlib.md5(raw.encode('utf-8')).hexdigest(), version // 1000
+
+
+class ConditionalGetMixin:
+    cache_resource = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = self.last_modified = None
+        if request.method not in ('GET', 'HEAD') or not versions_are_shared():
+            return
+        user_id = request.user.pk if request.user.is_authenticated else ''
+        self.etag, self.last_modified = resource_validators(
+            self.cache_resource, request._request, request.accepted_renderer.format, user_id)
+        response = get_conditional_response(request._request, etag=self.etag, last_modified=self.last_modified)
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            self.add_validators(exc.response)
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'etag', None) is not None and response.status_code == 200:
+            self.add_validators(response)
+        return response
+
+    def add_validators(self, response):
+        response['ETag'] = self.etag
+        response['Last-Modified'] = http_date(self.last_modified)
+        if not response.has_header('Cache-Control'):
+            response['Cache-Control'] = 'no-cache'
@@ -0,0 +1,45 @@
+from rest_framework import serializers
+
+
+def _parse_names(value):
+    return tuple(sorted({name.strip() for name in value.split(',') if name.strip()}))
+
+
+def get_fieldset(request):
+    fieldset = {}
+    for param in ('fields', 'expand'):
+        value = request.query_params.get(param)
+        if value is not None:
+            fieldset[param] = _parse_names(value)
+    return fieldset
+
+
+# `fields` keeps only the named fields, `expand` keeps only the named nested serializers
+# expanded and collapses the others to primary keys.
+class SparseFieldsetMixin:
+    def __init__(self, *args, **kwargs):
+        self.fieldset = {param: kwargs.pop(param) for param in ('fields', 'expand') if param in kwargs}
+        super().__init__(*args, **kwargs)
+        fields = self.fieldset.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        expand = self.fieldset.get('expand')
+        if expand is not None:
+            for name, field in list(self.fields.items()):
+                if name not in expand:
+                    self.collapse_field(name, field)
+
+    def collapse_field(self, name, field):
+        many = isinstance(field, serializers.ListSerializer)
+        nested = field.child if many else field
+        if not isinstance(nested, serializers.ModelSerializer):
+            return
+        kwargs = {'read_only': True, 'many': many}
+        if field.source != name:
+            kwargs['source'] = field.source
+        self.fields[name] = serializers.PrimaryKeyRelatedField(**kwargs)
+
+    @property
+    def is_pruned(self):
+        return 'fields' in self.fieldset
@@ -0,0 +1,35 @@
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+
+
+def prefetch_generic(instances, field_name, get_queryset):
+    # Resolves the GenericForeignKey `field_name` of every instance with one pk__in query per content
+    # type; get_queryset(model) gives the queryset each type is loaded from, so its own relations can
+    # be prefetched along with it. Returns {model: {pk: object}}.
+    if not instances:
+        return {}
+    field = instances[0]._meta.get_field(field_name)
+    content_type_attname = field.model._meta.get_field(field.ct_field).get_attname()
+
+    wanted = defaultdict(set)
+    for instance in instances:
+        content_type_id = getattr(instance, content_type_attname)
+        if content_type_id is not None:
+            wanted[content_type_id].add(getattr(instance, field.fk_field))
+
+    models, targets = {}, {}
+    for content_type_id, pks in wanted.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is None:
+            continue
+        models[content_type_id] = model
+        targets[model] = get_queryset(model).in_bulk(pks)
+
+    for instance in instances:
+        model = models.get(getattr(instance, content_type_attname))
+        target = targets[model].get(getattr(instance, field.fk_field)) if model is not None else None
+        # Dangling links are left alone and resolve (to None) the usual way.
+        if target is not None:
+            field.set_cached_value(instance, target)
+    return targets
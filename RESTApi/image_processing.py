@@ -0,0 +1,158 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps
+from sorl.thumbnail import get_thumbnail
+
+from .models import Gallery, ImageVariant, Profile, Sponsor
+
+logger = logging.getLogger(__name__)
+
+# Image field of each model that gets WebP/AVIF variants.
+VARIANT_FIELDS = {
+    Gallery: 'image',
+    Profile: 'avatar',
+    Sponsor: 'logo',
+}
+
+_lock = threading.Lock()
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2),
+                                           thread_name_prefix='thumbnails')
+        return _executor
+
+
+def get_geometry(name):
+    return settings.GALLERY_THUMBNAILS[name]
+
+
+def generate_thumbnails(gallery):
+    image_name = gallery.image.name
+    for geometry, options in settings.GALLERY_THUMBNAILS.values():
+        get_thumbnail(gallery.image, geometry, **options)
+    # The image may have been replaced while we were working; its own job will finish it.
+    if Gallery.objects.filter(pk=gallery.pk, image=image_name).exists():
+        gallery.thumbnails_ready = True
+        gallery.save(update_fields=['thumbnails_ready'])
+
+
+def variant_formats():
+    Image.init()
+    return [name for name in settings.IMAGE_VARIANT_FORMATS if name.upper() in Image.SAVE]
+
+
+def _open(field):
+    with field.open('rb'):
+        image = Image.open(field)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA') or image.mode == 'P' and 'transparency' in image.info:
+        return image.convert('RGBA')
+    return image.convert('RGB')
+
+
+def _encode(image, name):
+    buffer = io.BytesIO()
+    image.save(buffer, name.upper(), quality=settings.IMAGE_VARIANT_QUALITY[name])
+    return buffer.getvalue()
+
+
+def generate_variants(instance, force=False):
+    field = getattr(instance, VARIANT_FIELDS[type(instance)])
+    content_type = ContentType.objects.get_for_model(instance)
+    existing = ImageVariant.objects.filter(content_type=content_type, object_id=instance.pk)
+    if not field:
+        existing.delete()
+        return
+    if not force and existing.exists() and not existing.exclude(source_name=field.name).exists():
+        return
+
+    image = _open(field)
+    stem = os.path.splitext(os.path.basename(field.name))[0]
+    widths = sorted({min(width, image.width) for width in settings.IMAGE_VARIANT_WIDTHS})
+    variants = []
+    try:
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            for name in variant_formats():
+                variant = ImageVariant(content_type=content_type, object_id=instance.pk, source_name=field.name,
+                                       format=name, width=width, height=height)
+                variant.file.save(f'{stem}_{width}w.{name}', ContentFile(_encode(resized, name)), save=False)
+                variants.append(variant)
+
+        with transaction.atomic():
+            existing.delete()
+            for variant in variants:
+                variant.save()
+    except BaseException:
+        # Files are written before their rows; without the rows nothing would ever release them.
+        for variant in variants:
+            variant.file.delete(save=False)
+        raise
+
+
+def _attempt(step, instance, products):
+    # Thumbnails and variants fail independently: an image Pillow cannot encode to AVIF still gets
+    # its thumbnails, and the other way round.
+    try:
+        step(instance)
+    except Exception:
+        logger.exception('Generating the %s of %s %s failed', products, type(instance).__name__, instance.pk)
+
+
+def _run(model, pk):
+    try:
+        instance = model.objects.get(pk=pk)
+        if model is Gallery and instance.image and not instance.thumbnails_ready:
+            _attempt(generate_thumbnails, instance, 'thumbnails')
+        _attempt(generate_variants, instance, 'image variants')
+    except model.DoesNotExist:
+        pass
+    except Exception:
+        logger.exception('Processing the image of %s %s failed', model.__name__, pk)
+    finally:
+        connections.close_all()
+
+
+def schedule_image_processing(instance):
+    model, pk = type(instance), instance.pk
+    transaction.on_commit(lambda: _get_executor().submit(_run, model, pk))
+
+
+@receiver(post_save, sender=Gallery)
+@receiver(post_save, sender=Profile)
+@receiver(post_save, sender=Sponsor)
+def queue_image_processing(sender, instance, **kwargs):
+    # Only a new or removed image needs work; most saves (a Profile on every User save) keep theirs.
+    # The names compared are the committed ones, so re-uploading identical bytes changes nothing.
+    name = VARIANT_FIELDS[sender]
+    stored = getattr(instance, '_stored_files', {}).get(name)
+    if stored is None or stored == (getattr(instance, name).name or ''):
+        return
+    if sender is Gallery and instance.thumbnails_ready:
+        instance.thumbnails_ready = False
+        Gallery.objects.filter(pk=instance.pk).update(thumbnails_ready=False)
+    schedule_image_processing(instance)
+
+
+@receiver(post_delete, sender=ImageVariant)
+def delete_variant_file(sender, instance, **kwargs):
+    if instance.file:
+        storage, name = instance.file.storage, instance.file.name
+        transaction.on_commit(lambda: storage.delete(name))
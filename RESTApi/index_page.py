@@ -0,0 +1,89 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.template import engines
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from dynamic_preferences.models import GlobalPreferenceModel
+
+from .preferences import get_preferences
+from .resource_versions import VersionedSnapshot
+from .static_serving import REVALIDATE, compressors, negotiate_encoding
+
+# Global preferences the SPA shell is rendered with, as template variables.
+INDEX_PREFERENCES = {
+    'site_title': 'general__title',
+    'default_page_color': 'general__default_page_color',
+}
+
+
+class IndexPage:
+    # The rendered shell, kept as bytes in every content coding we can produce.
+    def __init__(self, key, content):
+        self.key = key
+        self.content = {None: content}
+        for encoding, compress in compressors().items():
+            self.content[encoding] = compress(content)
+        self.digest = hashlib.sha1(content).hexdigest()[:16]
+
+    def etag(self, encoding):
+        return '"%s%s"' % (self.digest, '-' + encoding if encoding else '')
+
+
+def index_path():
+    return os.path.join(settings.STATIC_ROOT, 'index.html')
+
+
+def index_preferences():
+    preferences = get_preferences()
+    return {name: preferences[key] for name, key in INDEX_PREFERENCES.items()}
+
+
+def render_index(path, preferences):
+    with open(path, encoding='utf-8') as source:
+        template = engines['django'].from_string(source.read())
+    return template.render(preferences).encode('utf-8')
+
+
+def _load_index_page():
+    path = index_path()
+    stat = os.stat(path)
+    return IndexPage((stat.st_mtime_ns, stat.st_size), render_index(path, index_preferences()))
+
+
+# Rendered again when the preferences version moves or the frontend build replaces index.html;
+# serving a hit costs a stat() and no query.
+_page = VersionedSnapshot('preferences', _load_index_page)
+
+
+def get_index_page():
+    page = _page.get()
+    stat = os.stat(index_path())
+    if page.key != (stat.st_mtime_ns, stat.st_size):
+        _page.clear()
+        page = _page.get()
+    return page
+
+
+@receiver(post_save, sender=GlobalPreferenceModel)
+def reset_index_page(sender, **kwargs):
+    transaction.on_commit(_page.clear)
+
+
+def serve_index(request):
+    page = get_index_page()
+    encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING'), page.content)
+    etag = page.etag(encoding)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(page.content[encoding], content_type='text/html; charset=utf-8')
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Cache-Control'] = REVALIDATE
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from RESTApi import pdf_rendering
+
+SAMPLE = {
+    'rental_date': '2019-03-01',
+    'return_date': '2019-03-15',
+    'first_name': 'Zażółć',
+    'last_name': 'Gęślą',
+    'index_number': '123456',
+    'hardware_name': 'Raspberry Pi 3 Model B+',
+    'serial_number': 'RPI-0042',
+}
+
+
+class Command(BaseCommand):
+    help = 'Compares the per-document cost of full rendering and of stamping the pre-rendered template'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        pdf_rendering.init_worker()
+        self.stdout.write(f'worker setup (font, logo, template): {(time.perf_counter() - started) * 1000:.1f} ms')
+        if pdf_rendering._template is None:
+            self.stdout.write(self.style.WARNING('template could not be built, documents fall back to full rendering'))
+            return
+        for label, render in (('full render', pdf_rendering.render_full_document),
+                              ('stamped template', pdf_rendering.render_rental_document)):
+            started = time.perf_counter()
+            for _ in range(options['count']):
+                document = render(SAMPLE)
+            elapsed = (time.perf_counter() - started) * 1000 / options['count']
+            self.stdout.write(f'{label}: {elapsed:.3f} ms/document, {len(document)} bytes')
@@ -0,0 +1,25 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from RESTApi.models import UploadSession
+from RESTApi.uploads import expired_sessions
+
+
+class Command(BaseCommand):
+    help = 'Deletes chunked upload sessions idle for longer than UPLOAD_SESSION_MAX_AGE, and stray staged files'
+
+    def handle(self, *args, **options):
+        expired = 0
+        for session in expired_sessions().iterator():
+            session.delete()
+            expired += 1
+        stray = 0
+        if os.path.isdir(settings.UPLOAD_SESSION_ROOT):
+            live = {pk.hex for pk in UploadSession.objects.values_list('pk', flat=True)}
+            for name in os.listdir(settings.UPLOAD_SESSION_ROOT):
+                if name not in live:
+                    os.remove(os.path.join(settings.UPLOAD_SESSION_ROOT, name))
+                    stray += 1
+        self.stdout.write(self.style.SUCCESS(f'Deleted {expired} expired sessions and {stray} stray files'))
@@ -0,0 +1,75 @@
+import os
+from collections import Counter
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from RESTApi.models import Blob
+from RESTApi.resource_versions import invalidate_models
+from RESTApi.storage import BLOB_PREFIX, ContentAddressedStorage, is_blob
+
+
+def _file_fields():
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage):
+                yield model, field
+
+
+class Command(BaseCommand):
+    help = 'Moves legacy uploads into the content-addressed blob store and recounts blob references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true', help='Delete blobs nothing references')
+
+    def handle(self, *args, **options):
+        moved = 0
+        changed = set()
+        for model, field in _file_fields():
+            legacy = model._default_manager.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True}) \
+                .exclude(**{f'{field.name}__startswith': BLOB_PREFIX})
+            for pk, name in legacy.values_list('pk', field.name).iterator():
+                if not field.storage.exists(name):
+                    self.stderr.write(f'{model.__name__} {pk}: {name} is missing')
+                    continue
+                with field.storage.open(name) as content:
+                    blob = field.storage.save(name, content)
+                model._default_manager.filter(pk=pk).update(**{field.name: blob})
+                moved += 1
+                changed.add(model)
+                if not model._default_manager.filter(**{field.name: name}).exists():
+                    field.storage.delete(name)
+
+        # Responses and ETags embedding the old file names are stale now.
+        invalidate_models(changed)
+
+        references = Counter()
+        for model, field in _file_fields():
+            names = model._default_manager.filter(**{f'{field.name}__startswith': BLOB_PREFIX})
+            references.update(names.values_list(field.name, flat=True).iterator())
+        storage = ContentAddressedStorage()
+        for blob in Blob.objects.all().iterator():
+            count = references.pop(blob.name, 0)
+            if blob.references != count:
+                Blob.objects.filter(pk=blob.pk).update(references=count)
+        for name, count in references.items():
+            if storage.exists(name):
+                Blob.objects.create(name=name, size=storage.size(name), references=count)
+            else:
+                self.stderr.write(f'{name} is referenced but missing')
+
+        pruned = 0
+        if options['prune']:
+            for name in Blob.objects.filter(references=0).values_list('name', flat=True):
+                storage.delete(name)
+                pruned += 1
+            known = set(Blob.objects.values_list('name', flat=True))
+            root = storage.path(BLOB_PREFIX.rstrip('/'))
+            for directory, _, files in os.walk(root):
+                for file_name in files:
+                    name = os.path.relpath(os.path.join(directory, file_name), storage.location).replace(os.sep, '/')
+                    if is_blob(name) and name not in known and not name.startswith(BLOB_PREFIX + 'tmp/'):
+                        os.remove(os.path.join(directory, file_name))
+                        pruned += 1
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} files into blobs, pruned {pruned} blobs'))
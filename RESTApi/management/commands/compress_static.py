@@ -0,0 +1,57 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from RESTApi.static_serving import ENCODINGS, compressors
+
+DEFAULT_PATHS = ('index.html', 'js', 'css')
+
+
+class Command(BaseCommand):
+    help = 'Writes .br and .gz files next to the frontend assets in STATIC_ROOT (.br needs the brotli package)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS,
+                            help='Files or directories under STATIC_ROOT, by default: %s' % ' '.join(DEFAULT_PATHS))
+        parser.add_argument('--force', action='store_true', help='Recompress files that are already up to date')
+
+    def get_files(self, paths):
+        suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        for path in paths:
+            path = os.path.join(settings.STATIC_ROOT, path)
+            if os.path.isfile(path):
+                yield path
+            for directory, _, names in os.walk(path):
+                for name in sorted(names):
+                    if not name.endswith(suffixes):
+                        yield os.path.join(directory, name)
+
+    def handle(self, *args, **options):
+        encoders = compressors()
+        if 'br' not in encoders:
+            self.stderr.write('brotli is not installed, writing .gz files only')
+        written = skipped = 0
+        for path in self.get_files(options['paths']):
+            modified = os.path.getmtime(path)
+            data = None
+            for encoding, suffix in ENCODINGS:
+                if encoding not in encoders:
+                    continue
+                target = path + suffix
+                if not options['force'] and os.path.exists(target) and os.path.getmtime(target) >= modified:
+                    skipped += 1
+                    continue
+                if data is None:
+                    with open(path, 'rb') as source:
+                        data = source.read()
+                compressed = encoders[encoding](data)
+                # Not worth serving when it saves nothing, e.g. for already compressed fonts and images.
+                if len(compressed) >= len(data):
+                    if os.path.exists(target):
+                        os.remove(target)
+                    continue
+                with open(target, 'wb') as output:
+                    output.write(compressed)
+                written += 1
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} compressed files, {skipped} were up to date'))
@@ -0,0 +1,25 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from RESTApi.rental_export import filter_rentals, stream_archive
+
+
+class Command(BaseCommand):
+    help = 'Writes a ZIP of hardware rental documents, rendering the missing ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the ZIP file to write')
+        parser.add_argument('--since', help='First rental date, YYYY-MM-DD')
+        parser.add_argument('--until', help='Last rental date, YYYY-MM-DD')
+        parser.add_argument('--user', help='User id')
+        parser.add_argument('--hardware', help='Hardware id')
+
+    def handle(self, *args, **options):
+        try:
+            rentals = filter_rentals(options['since'], options['until'], options['user'], options['hardware'])
+        except ValidationError as error:
+            raise CommandError(error.message_dict)
+        with open(options['output'], 'wb') as output:
+            for chunk in stream_archive(rentals):
+                output.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f'Exported {rentals.count()} documents to {options["output"]}'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from RESTApi.image_processing import VARIANT_FIELDS, generate_variants
+
+
+class Command(BaseCommand):
+    help = 'Generates the WebP/AVIF variants of gallery images, avatars and sponsor logos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that are already up to date')
+
+    def handle(self, *args, **options):
+        generated = failed = 0
+        for model, field_name in VARIANT_FIELDS.items():
+            for instance in model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True}).iterator():
+                try:
+                    generate_variants(instance, force=options['force'])
+                    generated += 1
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f'{model.__name__} {instance.pk}: {error}')
+        self.stdout.write(self.style.SUCCESS(f'Processed {generated} images, {failed} failed'))
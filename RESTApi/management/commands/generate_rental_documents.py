@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from RESTApi.models import HardwareRental
+from RESTApi.rental_documents import generate_document
+
+
+class Command(BaseCommand):
+    help = 'Renders the documents of hardware rentals left pending or failed (e.g. by a restart)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Render every rental, not only unfinished ones')
+
+    def handle(self, *args, **options):
+        rentals = HardwareRental.objects.select_related('user__profile', 'hardware')
+        if not options['all']:
+            rentals = rentals.exclude(document_status=HardwareRental.DOCUMENT_READY)
+        generated = 0
+        for rental in rentals.iterator():
+            generate_document(rental)
+            generated += 1
+        self.stdout.write(self.style.SUCCESS(f'Generated {generated} documents'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from RESTApi.image_processing import generate_thumbnails
+from RESTApi.models import Gallery
+
+
+class Command(BaseCommand):
+    help = 'Generates the configured thumbnails of gallery images that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate every image, not only unfinished ones')
+
+    def handle(self, *args, **options):
+        galleries = Gallery.objects.exclude(image='')
+        if not options['all']:
+            galleries = galleries.filter(thumbnails_ready=False)
+        generated = failed = 0
+        for gallery in galleries.iterator():
+            try:
+                generate_thumbnails(gallery)
+                generated += 1
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'{gallery.pk} {gallery.image.name}: {error}')
+        self.stdout.write(self.style.SUCCESS(f'Generated thumbnails for {generated} images, {failed} failed'))
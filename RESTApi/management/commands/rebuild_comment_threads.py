@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+
+from RESTApi.models import Comment
+from RESTApi.resource_versions import invalidate_models
+
+
+class Command(BaseCommand):
+    help = 'Fills the root article of every comment so threads can be loaded with a single query'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = Comment.objects.filter(article__isnull=False).update(root_article=F('article'))
+            parent_root = Comment.objects.filter(pk=OuterRef('parent_id')).values('root_article')[:1]
+            level = updated
+            while level:
+                level = Comment.objects.filter(
+                    root_article__isnull=True, parent__root_article__isnull=False
+                ).update(root_article=Subquery(parent_root))
+                updated += level
+            invalidate_models([Comment])
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} comments'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from RESTApi.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Recreates the full-text search index of articles and projects'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        backend = get_backend(options['database'])
+        backend.ensure_table()
+        indexed = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} documents'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from RESTApi.models import Article, Comment
+from RESTApi.resource_versions import invalidate_models
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the stored comment counter of every article (run rebuild_comment_threads first on old data)'
+
+    def handle(self, *args, **options):
+        counts = Comment.objects.filter(root_article=OuterRef('pk')).order_by() \
+            .values('root_article').annotate(count=Count('pk')).values('count')
+        updated = Article.objects.update(comments_count=Coalesce(Subquery(counts), 0))
+        invalidate_models([Article])
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} articles'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from RESTApi.availability import active_rentals, sync_status
+from RESTApi.models import Hardware
+
+
+class Command(BaseCommand):
+    help = 'Marks hardware with an active rental as Rented, and returned Rented hardware as Available'
+
+    def handle(self, *args, **options):
+        rented = set(active_rentals().values_list('hardware_id', flat=True))
+        stale = Hardware.objects.filter(status=Hardware.RENTED).exclude(pk__in=rented)
+        changed = 0
+        for hardware_id in rented | set(stale.values_list('pk', flat=True)):
+            before = Hardware.objects.filter(pk=hardware_id).values_list('status', flat=True).first()
+            sync_status(hardware_id)
+            changed += before != Hardware.objects.filter(pk=hardware_id).values_list('status', flat=True).first()
+        self.stdout.write(self.style.SUCCESS(f'Updated the status of {changed} pieces of hardware'))
@@ -0,0 +1,187 @@
+# Generated by Django 2.2.28 on 2026-10-18 17:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Article',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=100)),
+                ('alias', models.CharField(max_length=100)),
+                ('text', models.TextField()),
+                ('creation_date', models.DateTimeField()),
+                ('publication_date', models.DateTimeField(null=True)),
+                ('authors', models.ManyToManyField(blank=True, to=settings.AUTH_USER_MODEL)),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='articles', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FooterLink',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('link', models.URLField()),
+                ('title', models.CharField(max_length=128)),
+                ('icon', models.CharField(max_length=64)),
+                ('color', models.CharField(max_length=64)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Gallery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gallery_name', models.CharField(max_length=100)),
+                ('image', models.ImageField(upload_to='gallery/')),
+            ],
+            options={
+                'verbose_name_plural': 'galleries',
+            },
+        ),
+        migrations.CreateModel(
+            name='Hardware',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.TextField()),
+                ('description', models.TextField()),
+                ('serial_number', models.TextField()),
+                ('status', models.TextField(choices=[('Rented', 'Rented'), ('Available', 'Available'), ('Unavailable', 'Unavailable')], default='Unavailable')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Profile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.TextField(blank=True, null=True)),
+                ('avatar', models.ImageField(null=True, upload_to='avatars/')),
+                ('index_number', models.CharField(default=None, max_length=6, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Project',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=100)),
+                ('text', models.TextField()),
+                ('creation_date', models.DateTimeField()),
+                ('publication_date', models.DateTimeField(null=True)),
+                ('authors', models.ManyToManyField(blank=True, to=settings.AUTH_USER_MODEL)),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='projects', to=settings.AUTH_USER_MODEL)),
+                ('gallery', models.ManyToManyField(blank=True, to='RESTApi.Gallery')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Sponsor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=60)),
+                ('url', models.URLField(null=True)),
+                ('logo', models.ImageField(upload_to='sponsor_logo/')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Section',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.TextField()),
+                ('description', models.TextField()),
+                ('isVisible', models.BooleanField()),
+                ('icon', models.TextField(blank=True, null=True)),
+                ('gallery', models.ManyToManyField(blank=True, to='RESTApi.Gallery')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RepoLink',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('link', models.URLField()),
+                ('link_type', models.CharField(choices=[('GITHUB', 'GITHUB'), ('GITLAB', 'GITLAB'), ('BITBUCKET', 'BITBUCKET'), ('BLOG', 'BLOG'), ('PORTFOLIO', 'PORTFOLIO'), ('OTHER', 'OTHER')], default='OTHER', max_length=100)),
+                ('project', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='repository_links', to='RESTApi.Project')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='section',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='projects', to='RESTApi.Section'),
+        ),
+        migrations.CreateModel(
+            name='ProfileLink',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('link', models.URLField()),
+                ('link_type', models.CharField(choices=[('GITHUB', 'GITHUB'), ('GITLAB', 'GITLAB'), ('BITBUCKET', 'BITBUCKET'), ('BLOG', 'BLOG'), ('PORTFOLIO', 'PORTFOLIO'), ('OTHER', 'OTHER')], default='OTHER', max_length=100)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='profile_links', to='RESTApi.Profile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='HardwareRental',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rental_date', models.DateTimeField()),
+                ('return_date', models.DateTimeField(blank=True, null=True)),
+                ('file', models.FileField(blank=True, upload_to='hardware_rental/')),
+                ('hardware', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rentals', to='RESTApi.Hardware')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rentals', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GenericLink',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('link', models.URLField()),
+                ('object_id', models.PositiveIntegerField()),
+                ('link_type', models.CharField(choices=[('GITHUB', 'GITHUB'), ('GITLAB', 'GITLAB'), ('BITBUCKET', 'BITBUCKET'), ('BLOG', 'BLOG'), ('PORTFOLIO', 'PORTFOLIO'), ('OTHER', 'OTHER')], max_length=100)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='File',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creation_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='RESTApi.Article')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='RESTApi.Profile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Comment',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField()),
+                ('creation_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('article', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='RESTApi.Article')),
+                ('parent', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='RESTApi.Comment')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='gallery',
+            field=models.ManyToManyField(blank=True, to='RESTApi.Gallery'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='tags',
+            field=models.ManyToManyField(blank=True, to='RESTApi.Tag'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+import django.db.models.deletion
+
+
+def fill_root_article(apps, schema_editor):
+    # Top-level comments are rooted at their article, replies at the root of their parent,
+    # one level of the thread at a time.
+    Comment = apps.get_model('RESTApi', 'Comment')
+    level = Comment.objects.filter(article__isnull=False).update(root_article=F('article'))
+    parent_root = Comment.objects.filter(pk=OuterRef('parent_id')).values('root_article')[:1]
+    while level:
+        level = Comment.objects.filter(
+            root_article__isnull=True, parent__root_article__isnull=False
+        ).update(root_article=Subquery(parent_root))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('RESTApi', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='root_article',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='thread_comments', to='RESTApi.Article'),
+        ),
+        migrations.RunPython(fill_root_article, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('RESTApi', '0002_comment_root_article'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['article', 'creation_date'], name='RESTApi_com_article_18f7d9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['parent', 'creation_date'], name='RESTApi_com_parent__186e33_idx'),
+        ),
+    ]
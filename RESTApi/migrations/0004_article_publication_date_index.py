@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('RESTApi', '0003_comment_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['publication_date', 'id'], name='RESTApi_art_publica_c3097a_idx'),
+        ),
+    ]
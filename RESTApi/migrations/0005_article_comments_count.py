@@ -0,0 +1,27 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_comments(apps, schema_editor):
+    Article = apps.get_model('RESTApi', 'Article')
+    Comment = apps.get_model('RESTApi', 'Comment')
+    counts = Comment.objects.filter(root_article=OuterRef('pk')).order_by() \
+        .values('root_article').annotate(count=Count('pk')).values('count')
+    Article.objects.update(comments_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('RESTApi', '0004_article_publication_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='comments_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+def mark_existing_documents(apps, schema_editor):
+    # Rentals that already carry a file were rendered before the worker pool existed.
+    HardwareRental = apps.get_model('RESTApi', 'HardwareRental')
+    HardwareRental.objects.exclude(file='').update(document_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('RESTApi', '0005_article_comments_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hardwarerental',
+            name='document_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', editable=False, max_length=16),
+        ),
+        migrations.RunPython(mark_existing_documents, migrations.RunPython.noop),
+    ]
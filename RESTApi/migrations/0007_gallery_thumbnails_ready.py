@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+def mark_existing_galleries(apps, schema_editor):
+    # Existing images keep the thumbnails sorl-thumbnail renders on first request; run
+    # generate_thumbnails to warm them ahead of time.
+    Gallery = apps.get_model('RESTApi', 'Gallery')
+    Gallery.objects.update(thumbnails_ready=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('RESTApi', '0006_hardwarerental_document_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gallery',
+            name='thumbnails_ready',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(mark_existing_galleries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('RESTApi', '0010_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hardwarerental',
+            name='returned_date',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='hardware',
+            index=models.Index(fields=['status'], name='RESTApi_har_status_8b9647_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import F
+from django.utils import timezone
+
+
+def backfill_returned_date(apps, schema_editor):
+    # Rentals from before returned_date existed would all count as active and break the unique
+    # constraint. Those past their return date are taken as returned on it; of the rest, only the
+    # latest rental of each piece of hardware stays out, the earlier ones ended when the next began.
+    HardwareRental = apps.get_model('RESTApi', 'HardwareRental')
+    HardwareRental.objects.filter(returned_date__isnull=True, return_date__lte=timezone.now()) \
+        .update(returned_date=F('return_date'))
+    later_start = {}
+    open_rentals = HardwareRental.objects.filter(returned_date__isnull=True).order_by('hardware_id', '-rental_date', '-pk')
+    for pk, hardware_id, rental_date in open_rentals.values_list('pk', 'hardware_id', 'rental_date'):
+        if hardware_id in later_start:
+            HardwareRental.objects.filter(pk=pk).update(returned_date=later_start[hardware_id])
+        later_start[hardware_id] = rental_date
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('RESTApi', '0011_hardwarerental_returned_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_returned_date, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('RESTApi', '0012_backfill_returned_date'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='hardwarerental',
+            constraint=models.UniqueConstraint(condition=models.Q(returned_date__isnull=True), fields=('hardware',), name='unique_active_hardware_rental'),
+        ),
+    ]
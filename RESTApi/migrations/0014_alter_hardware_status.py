@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('RESTApi', '0013_unique_active_hardware_rental'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='hardware',
+            name='status',
+            field=models.TextField(choices=[('Rented', 'Rented'), ('Available', 'Available'), ('Unavailable', 'Unavailable')], default='Available'),
+        ),
+    ]
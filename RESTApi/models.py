@@ -1,9 +1,12 @@
+import uuid
+
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.utils import timezone
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from sorl.thumbnail import ImageField
 
@@ -35,6 +38,36 @@ class GenericLink(models.Model):
         return "%s" % self.link
 
 
+class Blob(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    references = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return "%s (%d)" % (self.name, self.references)
+
+
+class ImageVariant(models.Model):
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    source = GenericForeignKey('content_type', 'object_id')
+    source_name = models.CharField(max_length=255)
+    format = models.CharField(max_length=8)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    file = models.FileField(upload_to='variants/', max_length=255)
+
+    def __str__(self):
+        return "%s %dw %s" % (self.source_name, self.width, self.format)
+
+    class Meta:
+        ordering = ['format', 'width']
+        indexes = [
+            models.Index(fields=['content_type', 'object_id']),
+        ]
+
+
 class Profile(models.Model):
     # Admin Owner
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -42,6 +75,7 @@ class Profile(models.Model):
     avatar = models.ImageField(upload_to='avatars/', null=True)
     index_number = models.CharField(max_length=6, default=None, null=True)
     links = GenericRelation(GenericLink)
+    variants = GenericRelation(ImageVariant)
 
     def __str__(self):
         return self.user.username
@@ -54,7 +88,9 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
+def save_user_profile(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
     instance.profile.save()
 
 
@@ -95,6 +131,8 @@ class Tag(models.Model):
 class Gallery(models.Model):
     gallery_name = models.CharField(max_length=100)
     image = models.ImageField(upload_to="gallery/")
+    thumbnails_ready = models.BooleanField(default=False, editable=False)
+    variants = GenericRelation(ImageVariant)
 
     def __str__(self):
         return "%s - %s" % (self.gallery_name, self.image.name)
@@ -117,10 +155,16 @@ class Article(models.Model):
 
     gallery = models.ManyToManyField('Gallery', blank=True)
     links = GenericRelation(GenericLink)
+    comments_count = models.IntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['publication_date', 'id']),
+        ]
+
 
 class Comment(models.Model):
     # Admin Owner
@@ -132,18 +176,60 @@ class Comment(models.Model):
                                 related_name='comments', null=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE,
                              related_name='comments')
+    root_article = models.ForeignKey('Article', on_delete=models.CASCADE,
+                                     related_name='thread_comments', null=True, editable=False)
 
     def save(self, *args, **kwargs):
         if (self.article or self.parent) and not (self.article and self.parent):
             pass
         else:
             raise Exception("U have to provide article id or parent id")
-        super(Comment, self).save(*args, **kwargs)
+        if self.article_id is not None:
+            self.root_article_id = self.article_id
+        else:
+            self.root_article_id = self.parent.root_article_id
+        with transaction.atomic():
+            stored_root = None
+            if self.pk is not None:
+                stored_root = Comment.objects.filter(pk=self.pk).values_list('root_article', flat=True).first()
+            super(Comment, self).save(*args, **kwargs)
+            if stored_root is not None and stored_root != self.root_article_id:
+                moved = 1 + len(self.move_replies())
+                Article.objects.filter(pk=stored_root).update(comments_count=F('comments_count') - moved)
+                Article.objects.filter(pk=self.root_article_id).update(comments_count=F('comments_count') + moved)
+
+    def move_replies(self):
+        # Replies follow a comment moved to another article, one level of the thread at a time.
+        level = [self.pk]
+        moved = []
+        while level:
+            level = list(Comment.objects.filter(parent__in=level).values_list('pk', flat=True))
+            moved += level
+        Comment.objects.filter(pk__in=moved).update(root_article=self.root_article_id)
+        return moved
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['article', 'creation_date']),
+            models.Index(fields=['parent', 'creation_date']),
+        ]
 
     def __str__(self):
         return "%s: %s - %s" % (self.article.title, self.user, self.text[0:50] + "..." if len(self.text) > 50 else self.text)
 
 
+@receiver(post_save, sender=Comment)
+def increment_comments_count(sender, instance, created, **kwargs):
+    if created and instance.root_article_id is not None:
+        Article.objects.filter(pk=instance.root_article_id).update(comments_count=F('comments_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comments_count(sender, instance, **kwargs):
+    if instance.root_article_id is not None:
+        Article.objects.filter(pk=instance.root_article_id).update(comments_count=F('comments_count') - 1)
+
+
 class File(models.Model):
     # Admin
     creation_date = models.DateTimeField(default=timezone.now)
@@ -157,30 +243,52 @@ class File(models.Model):
 
 
 class HardwareRental(models.Model):
+    DOCUMENT_PENDING = 'pending'
+    DOCUMENT_READY = 'ready'
+    DOCUMENT_FAILED = 'failed'
+    document_statuses = ((DOCUMENT_PENDING, 'Pending'),
+                         (DOCUMENT_READY, 'Ready'),
+                         (DOCUMENT_FAILED, 'Failed'))
     user = models.ForeignKey(User, on_delete=models.CASCADE,
                              related_name='rentals')
     hardware = models.ForeignKey('Hardware', on_delete=models.CASCADE,
                                  related_name='rentals')
     rental_date = models.DateTimeField()
     return_date = models.DateTimeField(null=True, blank=True)
+    returned_date = models.DateTimeField(null=True, blank=True)
     file = models.FileField(upload_to='hardware_rental/', blank=True)
+    document_status = models.CharField(max_length=16, choices=document_statuses, default=DOCUMENT_PENDING,
+                                       editable=False)
 
     def __str__(self):
         return "%s - %s" % (self.user.username, self.hardware.name)
 
+    class Meta:
+        constraints = [
+            # At most one rental of a piece of hardware is active; also indexes the active rentals.
+            models.UniqueConstraint(fields=['hardware'], condition=models.Q(returned_date__isnull=True),
+                                    name='unique_active_hardware_rental'),
+        ]
+
 
 class Hardware(models.Model):
-    statusy = (('Rented', 'Rented'),
-               ('Available', 'Available'),
-               ('Unavailable', 'Unavailable'))
+    RENTED = 'Rented'
+    AVAILABLE = 'Available'
+    UNAVAILABLE = 'Unavailable'
+    statusy = ((RENTED, 'Rented'),
+               (AVAILABLE, 'Available'),
+               (UNAVAILABLE, 'Unavailable'))
     name = models.TextField()
     description = models.TextField()
     serial_number = models.TextField()
-    status = models.TextField(choices=statusy, default='Unavailable')
+    status = models.TextField(choices=statusy, default=AVAILABLE)
 
     def __str__(self):
         return self.name
 
+    class Meta:
+        indexes = [models.Index(fields=['status'])]
+
 
 class Project(models.Model):
     title = models.CharField(max_length=100)
@@ -241,6 +349,7 @@ class Sponsor(models.Model):
     name = models.CharField(max_length=60)
     url = models.URLField(null=True)
     logo = models.ImageField(upload_to='sponsor_logo/')
+    variants = GenericRelation(ImageVariant)
 
 
 class FooterLink(models.Model):
@@ -250,4 +359,59 @@ class FooterLink(models.Model):
     color = models.CharField(max_length=64)
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+
+class UploadSession(models.Model):
+    GALLERY = 'gallery'
+    HARDWARE_RENTAL = 'hardware_rental'
+    targets = ((GALLERY, 'Gallery'),
+               (HARDWARE_RENTAL, 'Hardware rental'))
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='upload_sessions')
+    target = models.CharField(max_length=32, choices=targets)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    offset = models.BigIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return "%s (%d/%d)" % (self.filename, self.offset, self.size)
+
+
+@receiver(post_delete, sender=Gallery)
+@receiver(post_delete, sender=Profile)
+@receiver(post_delete, sender=Sponsor)
+@receiver(post_delete, sender=HardwareRental)
+def release_files(sender, instance, **kwargs):
+    # Shared blobs are reference-counted by the storage, so releasing them here is always safe.
+    for field in sender._meta.concrete_fields:
+        if isinstance(field, models.FileField):
+            file = getattr(instance, field.attname)
+            if file:
+                storage, name = file.storage, file.name
+                transaction.on_commit(lambda storage=storage, name=name: storage.delete(name))
+
+
+@receiver(pre_save, sender=Gallery)
+@receiver(pre_save, sender=Profile)
+@receiver(pre_save, sender=Sponsor)
+@receiver(pre_save, sender=HardwareRental)
+def remember_stored_files(sender, instance, update_fields=None, **kwargs):
+    # Reads the stored names of the file fields being saved, once per save, into
+    # instance._stored_files; post_save receivers compare them with the committed names.
+    fields = [field for field in sender._meta.concrete_fields
+              if isinstance(field, models.FileField) and (update_fields is None or field.name in update_fields)]
+    stored = None
+    if fields and instance.pk is not None:
+        stored = sender._default_manager.filter(pk=instance.pk).values(*[field.attname for field in fields]).first()
+    instance._stored_files = {field.attname: (stored or {}).get(field.attname) or '' for field in fields}
+    # A replaced upload gives up its reference to the old blob once the new name is committed.
+    for field in fields:
+        name = instance._stored_files[field.attname]
+        if name and name != getattr(instance, field.attname).name:
+            storage = field.storage
+            transaction.on_commit(lambda storage=storage, name=name: storage.delete(name))
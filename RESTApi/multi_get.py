@@ -0,0 +1,29 @@
+from collections import OrderedDict
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+MAX_IDS = 500
+
+
+def get_ids(request):
+    # `?ids=3,1,2` on a list view: the listed objects in that order, fetched by one pk__in query.
+    value = request.query_params.get('ids')
+    if value is None:
+        return None
+    try:
+        ids = list(OrderedDict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+    except ValueError:
+        raise ValidationError({'ids': 'Expected a comma-separated list of integer ids'})
+    if len(ids) > MAX_IDS:
+        raise ValidationError({'ids': 'At most %d ids can be fetched at once' % MAX_IDS})
+    return ids
+
+
+def multi_get_response(queryset, ids, serializer_class, **kwargs):
+    found = queryset.in_bulk(ids)
+    serializer = serializer_class([found[pk] for pk in ids if pk in found], many=True, **kwargs)
+    return Response(OrderedDict([
+        ('results', serializer.data),
+        ('missing', [pk for pk in ids if pk not in found]),
+    ]))
@@ -0,0 +1,130 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .preferences import get_preference
+
+
+class CommentCursorPagination(CursorPagination):
+    ordering = ('-creation_date', '-id')
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+class SearchPagination(LimitOffsetPagination):
+    default_limit = 20
+    max_limit = 100
+
+
+class PreferencePagination(LimitOffsetPagination):
+    # Pages hold general__default_items_on_page items unless the request asks for a limit.
+    @property
+    def default_limit(self):
+        return get_preference('general__default_items_on_page')
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    count_query_param = 'count'
+    page_size = 20
+    max_page_size = 100
+    ordering = ('-id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = getattr(view, 'keyset_ordering', self.ordering)
+        self.fields = [queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+        self.page_size = self.get_page_size(request)
+        self.count = queryset.count() if request.query_params.get(self.count_query_param) == 'true' else None
+
+        queryset = queryset.order_by(*self.get_order_by())
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.next_position = [field.value_from_object(results[-1]) for field in self.fields] if self.has_next else None
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def get_order_by(self):
+        order_by = []
+        for name, field in zip(self.ordering, self.fields):
+            expression = F(field.attname)
+            descending = name.startswith('-')
+            if field.null:
+                # Keep NULLs at the end in both directions so the position filter stays consistent.
+                order_by.append(expression.desc(nulls_last=True) if descending else expression.asc(nulls_last=True))
+            else:
+                order_by.append(expression.desc() if descending else expression.asc())
+        return order_by
+
+    def get_position_filter(self, position):
+        position_filter = Q()
+        equal = Q()
+        for name, field, value in zip(self.ordering, self.fields, position):
+            if value is None:
+                after = Q(pk__in=[])
+                same = Q(**{f'{field.attname}__isnull': True})
+            else:
+                lookup = 'lt' if name.startswith('-') else 'gt'
+                after = Q(**{f'{field.attname}__{lookup}': value})
+                if field.null:
+                    after |= Q(**{f'{field.attname}__isnull': True})
+                same = Q(**{field.attname: value})
+            position_filter |= equal & after
+            equal &= same
+        return position_filter
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if len(values) != len(self.fields):
+                raise ValueError
+            return [None if value is None else field.to_python(value) for field, value in zip(self.fields, values)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        values = [None if value is None else str(value) for value in position]
+        return urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), 'offset')
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        response = OrderedDict([('next', self.get_next_link()), ('results', data)])
+        if self.count is not None:
+            response['count'] = self.count
+            response.move_to_end('count', last=False)
+        return Response(response)
+
+
+def get_paginator(view, request):
+    if request.query_params.get('pagination') == 'keyset' or KeysetPagination.cursor_query_param in request.query_params:
+        return KeysetPagination()
+    return view.pagination_class()
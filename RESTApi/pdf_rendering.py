@@ -0,0 +1,209 @@
+import hashlib
+import io
+import logging
+import os
+import re
+import string
+import zlib
+
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+# Kept free of Django imports: this module is loaded by the PDF worker processes.
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+FONT_NAME = 'Verdana'
+FONT_PATH = os.path.join(TEMPLATES_DIR, 'verdana.ttf')
+LOGO_PATH = os.path.join(TEMPLATES_DIR, 'logo_color.bmp')
+
+# Glyphs embedded into the template up front, so the stamped fields can reuse its font subset.
+TEMPLATE_ALPHABET = string.printable.strip() + ' ąćęłńóśźżĄĆĘŁŃÓŚŹŻ„”–'
+FIELDS_FORM = 'fields'
+
+logger = logging.getLogger(__name__)
+
+_logo = None
+_template = None
+_initialized = False
+
+
+def init_worker():
+    global _logo, _template, _initialized
+    if _initialized:
+        return
+    pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH))
+    if os.path.exists(LOGO_PATH):
+        _logo = ImageReader(LOGO_PATH)
+    try:
+        _template = RentalDocumentTemplate()
+    except Exception:
+        # The template leans on ReportLab internals; any surprise there means full renders.
+        logger.exception('Preparing the rental document template failed')
+        _template = None
+    _initialized = True
+
+
+def draw_static(pdf):
+    pdf.setFont(FONT_NAME, 10)
+    if _logo is not None:
+        pdf.drawImage(_logo, 40, 720, width=192, height=103)
+    pdf.drawString(50, 710, 'Studenckie Koło Naukowe Informatyków „KOD”')
+    pdf.drawString(50, 696, 'Politechnika Rzeszowska')
+    pdf.drawString(50, 682, 'Katedra Informatyki i Automatyki')
+    pdf.setFont(FONT_NAME, 15)
+    pdf.drawCentredString(300, 600, 'Oświadczenie - rewers')
+    pdf.setFont(FONT_NAME, 10)
+    pdf.drawCentredString(300, 550, 'Ja, niżej podpisany:')
+    pdf.drawCentredString(300, 490, 'oświadczam, że wypożyczam następujący sprzęt:')
+    pdf.drawCentredString(300, 450,
+                          'którego właścicielem jest Politechnika Rzeszowska, Katedra Informatyki i Automatyki.')
+    pdf.drawCentredString(300, 430, f'W razie zgubienia lub uszkodzenia zobowiązuję się do pokrycia kosztów.')
+
+
+def variable_fields(data):
+    # (x, y, font size, text, centred)
+    fields = [
+        (400, 710, 10, f'Rzeszów, {data["rental_date"]}', False),
+        (300, 530, 10, f'{data["first_name"]} {data["last_name"]}', True),
+        (300, 510, 10, f'członek SKNI „KOD”, o numerze indeksu {data["index_number"]}', True),
+        (300, 470, 10, f'{data["hardware_name"]} o numerze seryjnym {data["serial_number"]}', True),
+    ]
+    if data['return_date']:
+        fields.append((300, 410, 10, f'Urządzenie zwrócę najpóźniej do dnia: {data["return_date"]}', True))
+    return fields
+
+
+def render_full_document(data):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer)
+    draw_static(pdf)
+    for x, y, size, text, centred in variable_fields(data):
+        pdf.setFont(FONT_NAME, size)
+        if centred:
+            pdf.drawCentredString(x, y, text)
+        else:
+            pdf.drawString(x, y, text)
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def _pdf_string(encoded):
+    escaped = bytearray(b'(')
+    for byte in encoded:
+        if byte in b'()\\':
+            escaped += b'\\' + bytes([byte])
+        elif 32 <= byte < 127:
+            escaped.append(byte)
+        else:
+            escaped += b'\\%03o' % byte
+    return bytes(escaped + b')')
+
+
+# The static page is rendered once and draws an empty form XObject. Each rental document is the
+# template with that form replaced by one holding only the variable fields, set in the font subset
+# the template already embeds, and the cross-reference table shifted to match. This saves the page
+# layout and font subsetting per document; the output is about as large as a full render, since the
+# shared subset carries the whole template alphabet rather than only the glyphs one rental uses.
+class RentalDocumentTemplate:
+    def __init__(self):
+        font = pdfmetrics.getFont(FONT_NAME)
+        buffer = io.BytesIO()
+        pdf = canvas.Canvas(buffer)
+        pdf.beginForm(FIELDS_FORM)
+        pdf.endForm()
+        draw_static(pdf)
+        pdf.doForm(FIELDS_FORM)
+        pdf.showPage()
+        doc = pdf._doc
+        font.splitString(TEMPLATE_ALPHABET, doc)
+        state = font.state[doc]
+        self.codes = dict(state.assignments)
+        self.font_names = [font.getSubsetInternalName(subset, doc) for subset in range(len(state.subsets))]
+        pdf.save()
+        self._parse(buffer.getvalue())
+
+    def _search(self, pattern, data):
+        match = re.search(pattern, data, re.S)
+        if match is None:
+            raise ValueError(f'Unexpected template layout: {pattern!r}')
+        return match
+
+    def _parse(self, pdf):
+        form_number = int(self._search(rb'/FormXob\.%s (\d+) 0 R' % FIELDS_FORM.encode(), pdf).group(1))
+        form = self._search(rb'\n(%d 0 obj\n(<<.*?>>)\s*stream\r?\n.*?endstream\s*endobj\n)' % form_number, pdf)
+        header = re.sub(rb'/Filter \[[^\]]*\] ', b'/Filter /FlateDecode ', form.group(2))
+        self.form_header = b'%d 0 obj\n' % form_number + re.sub(rb'/Length \d+', b'/Length %d', header)
+        self.form_start, form_end = form.start(1), form.end(1)
+        xref_start = int(self._search(rb'startxref\s+(\d+)\s*%%EOF\s*$', pdf).group(1))
+        xref = self._search(rb'xref\s+0 (\d+)\s+(.*?)trailer', pdf[xref_start:])
+        self.offsets = [int(entry[:10]) for entry in xref.group(2).split(b'\n') if entry.strip()]
+        if len(self.offsets) != int(xref.group(1)):
+            raise ValueError('Unexpected template cross-reference table')
+        trailer = pdf[xref_start:][xref.end(2):]
+        self.root = self._search(rb'/Root (\d+ \d+ R)', trailer).group(1)
+        self.info = self._search(rb'/Info (\d+ \d+ R)', trailer).group(1)
+        self.document_id = self._search(rb'/ID\s*\[<([0-9a-f]+)>', trailer).group(1)
+        self.head = pdf[:self.form_start]
+        self.tail = pdf[form_end:xref_start]
+        self.form_length = form_end - self.form_start
+
+    def encode(self, text):
+        # Yields (subset, encoded bytes) runs, or raises KeyError for glyphs the template lacks.
+        runs = []
+        for char in text:
+            code = self.codes[ord(char)]
+            subset, code = code >> 8, code & 0xff
+            if runs and runs[-1][0] == subset:
+                runs[-1][1].append(code)
+            else:
+                runs.append((subset, bytearray([code])))
+        return runs
+
+    def stream(self, data):
+        operations = [b'BT']
+        for x, y, size, text, centred in variable_fields(data):
+            if centred:
+                x -= pdfmetrics.stringWidth(text, FONT_NAME, size) / 2
+            operations.append(b'1 0 0 1 %.4f %.4f Tm' % (x, y))
+            for subset, encoded in self.encode(text):
+                operations.append(b'/%s %d Tf %s Tj' % (self.font_names[subset][1:].encode(), size,
+                                                          _pdf_string(encoded)))
+        operations.append(b'ET')
+        return b'\n'.join(operations)
+
+    def render(self, data):
+        try:
+            stream = zlib.compress(self.stream(data))
+        except KeyError:
+            return None
+        form = self.form_header % len(stream) + b'\nstream\n' + stream + b'\nendstream\nendobj\n'
+        shift = len(form) - self.form_length
+        entries = [b'0000000000 65535 f \n'] + [
+            b'%010d 00000 n \n' % (offset + shift if offset > self.form_start else offset)
+            for offset in self.offsets[1:]
+        ]
+        body = self.head + form + self.tail
+        revision_id = hashlib.md5(stream).hexdigest().encode()
+        return (
+            body
+            + b'xref\n0 %d\n' % len(entries) + b''.join(entries)
+            + b'trailer\n<< /Size %d /Root %s /Info %s /ID [<%s><%s>] >>\n' % (
+                len(entries), self.root, self.info, self.document_id, revision_id)
+            + b'startxref\n%d\n%%%%EOF\n' % len(body)
+        )
+
+
+def render_rental_document(data):
+    init_worker()
+    if _template is not None:
+        try:
+            document = _template.render(data)
+        except Exception:
+            logger.exception('Stamping the rental document template failed')
+            document = None
+        if document is not None:
+            return document
+    return render_full_document(data)
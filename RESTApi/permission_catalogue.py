@@ -0,0 +1,88 @@
+from django.contrib.auth.models import Permission, User
+from django.contrib.contenttypes.models import ContentType
+from django.db import DatabaseError, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .resource_versions import VersionedSnapshot, bump_versions
+
+# Version stamp of the permission table; a migration in one process reloads the catalogue in all.
+CATALOGUE_VERSION = 'permission_catalogue'
+
+_catalogue = None
+
+
+def _is_exposed(permission):
+    return permission.startswith('RESTApi') or permission.startswith('auth') and not permission.startswith('authtoken')
+
+
+def _load_permission_names():
+    permissions = Permission.objects.values_list('id', 'content_type__app_label', 'codename')
+    return {pk: f'{app_label}.{codename}' for pk, app_label, codename in permissions}
+
+
+_permission_names = VersionedSnapshot(CATALOGUE_VERSION, _load_permission_names)
+
+
+def get_permission_names():
+    return _permission_names.get()
+
+
+def get_permission_catalogue():
+    global _catalogue
+    names = get_permission_names()
+    catalogue = _catalogue
+    if catalogue is None or catalogue[0] is not names:
+        catalogue = _catalogue = (names, tuple(sorted(name for name in names.values() if _is_exposed(name))))
+    return catalogue[1]
+
+
+def invalidate_permission_catalogue():
+    _permission_names.clear()
+    transaction.on_commit(lambda: bump_versions([CATALOGUE_VERSION]))
+
+
+def prefetch_permissions(users):
+    # Fills the ModelBackend per-instance cache, so get_all_permissions() does not query again.
+    users = [user for user in users if user is not None and not hasattr(user, '_perm_cache')]
+    if not users:
+        return
+    regular = {user.pk: set() for user in users if user.is_active and not user.is_superuser}
+    rows = []
+    if regular:
+        rows.extend(User.user_permissions.through.objects.filter(user_id__in=regular)
+                    .values_list('user_id', 'permission_id'))
+        rows.extend(User.groups.through.objects.filter(user_id__in=regular, group__permissions__isnull=False)
+                    .values_list('user_id', 'group__permissions'))
+    names = get_permission_names()
+    if any(permission_id not in names for _, permission_id in rows):
+        _permission_names.clear()
+        names = get_permission_names()
+    for user_id, permission_id in rows:
+        if permission_id in names:
+            regular[user_id].add(names[permission_id])
+    for user in users:
+        if not user.is_active:
+            user._perm_cache = set()
+        elif user.is_superuser:
+            user._perm_cache = set(names.values())
+        else:
+            user._perm_cache = regular[user.pk]
+
+
+@receiver(post_migrate)
+def reset_catalogue_after_migrate(sender, **kwargs):
+    _permission_names.clear()
+    try:
+        bump_versions([CATALOGUE_VERSION])
+    except DatabaseError:
+        # The database cache table is created after the first migrate; there is nothing to reset yet.
+        pass
+
+
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+@receiver(post_save, sender=ContentType)
+@receiver(post_delete, sender=ContentType)
+def reset_catalogue_on_change(sender, **kwargs):
+    invalidate_permission_catalogue()
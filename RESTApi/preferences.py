@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from dynamic_preferences.models import GlobalPreferenceModel
+from dynamic_preferences.registries import global_preferences_registry
+
+from .resource_versions import VersionedSnapshot, versions_are_shared
+
+
+def _load_preferences():
+    return global_preferences_registry.manager().all()
+
+
+# Every global preference, served from process memory. Saving a preference in any worker bumps the
+# 'preferences' version on commit, and this snapshot reloads once it sees the new stamp.
+_snapshot = VersionedSnapshot('preferences', _load_preferences)
+
+
+def get_preferences():
+    if not versions_are_shared():
+        return _load_preferences()
+    return _snapshot.get()
+
+
+def get_preference(key):
+    return get_preferences()[key]
+
+
+@receiver(post_save, sender=GlobalPreferenceModel)
+def reset_preferences(sender, **kwargs):
+    transaction.on_commit(_snapshot.clear)
@@ -0,0 +1,102 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+class QueryPlan:
+    def __init__(self):
+        self.select_related = []
+        self.prefetch_related = []
+        self.annotations = {}
+        self.deferred = []
+
+    def apply(self, queryset):
+        if self.deferred:
+            queryset = queryset.defer(*self.deferred)
+        if self.annotations:
+            queryset = queryset.annotate(**self.annotations)
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        for path, model, plan in self.prefetch_related:
+            related_queryset = model._default_manager.all()
+            if plan is not None:
+                related_queryset = plan.apply(related_queryset)
+            queryset = queryset.prefetch_related(Prefetch(path, queryset=related_queryset))
+        return queryset
+
+
+def _nested_serializer(field):
+    if isinstance(field, serializers.ListSerializer):
+        field = field.child
+    if isinstance(field, serializers.ModelSerializer):
+        return field
+    return None
+
+
+def _collect(plan, serializer, model, prefix=''):
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or len(field.source_attrs) != 1:
+            continue
+        nested = _nested_serializer(field)
+        if nested is None and not isinstance(field, (serializers.RelatedField, serializers.ManyRelatedField)):
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation or model_field.related_model is None:
+            continue
+        path = prefix + field.source
+        if model_field.many_to_many or model_field.one_to_many:
+            plan.prefetch_related.append((path, model_field.related_model, build_query_plan(nested)))
+            continue
+        if nested is None and model_field.concrete and isinstance(field, serializers.PrimaryKeyRelatedField):
+            # The primary key is already on the row, no join needed.
+            continue
+        plan.select_related.append(path)
+        if nested is not None:
+            _collect(plan, nested, model_field.related_model, path + '__')
+
+
+def _deferred_columns(serializer, model):
+    # Method fields may read any column, so only plainly pruned serializers defer anything.
+    if not getattr(serializer, 'is_pruned', False):
+        return []
+    if any(isinstance(field, serializers.SerializerMethodField) for field in serializer.fields.values()):
+        return []
+    sources = {field.source_attrs[0] for field in serializer.fields.values() if field.source_attrs}
+    # Fields reading further columns off the instance declare them in required_columns.
+    for field in serializer.fields.values():
+        sources.update(getattr(field, 'required_columns', ()))
+    return [
+        field.name for field in model._meta.concrete_fields
+        if not field.primary_key and not field.is_relation and field.name not in sources
+    ]
+
+
+def build_query_plan(serializer):
+    if serializer is None:
+        return None
+    plan = QueryPlan()
+    plan.annotations.update({
+        name: annotation for name, annotation in getattr(serializer.Meta, 'annotations', {}).items()
+        if name in serializer.fields
+    })
+    plan.deferred = _deferred_columns(serializer, serializer.Meta.model)
+    _collect(plan, serializer, serializer.Meta.model)
+    return plan
+
+
+@lru_cache(maxsize=256)
+def _cached_query_plan(serializer_class, fieldset):
+    return build_query_plan(serializer_class(**dict(fieldset)))
+
+
+def get_query_plan(serializer_class, **fieldset):
+    return _cached_query_plan(serializer_class, tuple(sorted(fieldset.items())))
+
+
+def eager_load(queryset, serializer_class, **fieldset):
+    return get_query_plan(serializer_class, **fieldset).apply(queryset)
@@ -0,0 +1,108 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import DatabaseError, connections, transaction
+
+from .models import HardwareRental
+from .pdf_rendering import init_worker, render_rental_document
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_process_pool = None
+_thread_pool = None
+
+
+def _workers():
+    return getattr(settings, 'RENTAL_DOCUMENT_WORKERS', 2)
+
+
+def _get_pools():
+    # Rendering runs in spawned processes (ReportLab holds the GIL); each job is driven by a
+    # thread that does the database and storage work around it.
+    global _process_pool, _thread_pool
+    with _lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=_workers(), mp_context=multiprocessing.get_context('spawn'),
+                                                initializer=init_worker)
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=_workers(), thread_name_prefix='rental-documents')
+        return _process_pool, _thread_pool
+
+
+def _discard_process_pool(pool):
+    global _process_pool
+    with _lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False)
+
+
+def document_data(rental):
+    profile = getattr(rental.user, 'profile', None)
+    return {
+        'rental_date': str(rental.rental_date.date()),
+        'return_date': str(rental.return_date.date()) if rental.return_date else None,
+        'first_name': rental.user.first_name,
+        'last_name': rental.user.last_name,
+        'index_number': profile.index_number if profile is not None else '',
+        'hardware_name': rental.hardware.name,
+        'serial_number': rental.hardware.serial_number,
+    }
+
+
+def document_name(rental):
+    return f'glejt_{rental.pk}.pdf'
+
+
+def attach_document(rental, name, content):
+    # The old document's blob is released by the save once the new one is committed.
+    rental.file.save(name, content, save=False)
+    rental.document_status = HardwareRental.DOCUMENT_READY
+    # A regular save, so the version bump reaches clients polling the rental.
+    rental.save(update_fields=['file', 'document_status'])
+
+
+def save_document(rental, content):
+    attach_document(rental, document_name(rental), ContentFile(content))
+
+
+def generate_document(rental):
+    save_document(rental, render_rental_document(document_data(rental)))
+
+
+def _load(rental_id):
+    return HardwareRental.objects.select_related('user__profile', 'hardware').get(pk=rental_id)
+
+
+def _run(rental_id):
+    try:
+        rental = _load(rental_id)
+        process_pool, _ = _get_pools()
+        try:
+            content = process_pool.submit(render_rental_document, document_data(rental)).result()
+        except BrokenProcessPool:
+            _discard_process_pool(process_pool)
+            raise
+        save_document(rental, content)
+    except HardwareRental.DoesNotExist:
+        pass
+    except Exception:
+        logger.exception('Generating the document of hardware rental %s failed', rental_id)
+        try:
+            HardwareRental(pk=rental_id, document_status=HardwareRental.DOCUMENT_FAILED) \
+                .save(update_fields=['document_status'])
+        except DatabaseError:
+            pass
+    finally:
+        connections.close_all()
+
+
+def schedule_document(rental):
+    rental_id = rental.pk
+    transaction.on_commit(lambda: _get_pools()[1].submit(_run, rental_id))
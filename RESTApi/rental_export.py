@@ -0,0 +1,84 @@
+import zipfile
+
+from django.core.exceptions import ValidationError
+from django.utils.dateparse import parse_date
+
+from .models import HardwareRental
+from .pdf_rendering import render_rental_document
+from .rental_documents import document_data
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _StreamBuffer:
+    # Write-only sink for ZipFile: whatever was written so far is handed out by drain().
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _parse_id(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({name: 'Expected an integer id'})
+
+
+def _parse_date(value, name):
+    try:
+        date = parse_date(value)
+    except ValueError:
+        date = None
+    if date is None:
+        raise ValidationError({name: 'Expected a YYYY-MM-DD date'})
+    return date
+
+
+def filter_rentals(since=None, until=None, user=None, hardware=None):
+    rentals = HardwareRental.objects.select_related('user__profile', 'hardware').order_by('rental_date', 'pk')
+    if since:
+        rentals = rentals.filter(rental_date__date__gte=_parse_date(since, 'since'))
+    if until:
+        rentals = rentals.filter(rental_date__date__lte=_parse_date(until, 'until'))
+    if user:
+        rentals = rentals.filter(user_id=_parse_id(user, 'user'))
+    if hardware:
+        rentals = rentals.filter(hardware_id=_parse_id(hardware, 'hardware'))
+    return rentals
+
+
+def archive_name(rental):
+    return f'{rental.rental_date.date()}_{rental.pk}_{rental.user.username}.pdf'
+
+
+def _has_document(rental):
+    return bool(rental.file) and rental.file.storage.exists(rental.file.name)
+
+
+def stream_archive(rentals):
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for rental in rentals.iterator(chunk_size=200):
+            info = zipfile.ZipInfo(archive_name(rental), date_time=rental.rental_date.timetuple()[:6])
+            if not _has_document(rental):
+                # Rendered for the archive only: a GET stores nothing, generate_rental_documents does.
+                archive.writestr(info, render_rental_document(document_data(rental)))
+                yield buffer.drain()
+                continue
+            with rental.file.open('rb') as source, archive.open(info, 'w') as target:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                    target.write(chunk)
+                    yield buffer.drain()
+            yield buffer.drain()
+    yield buffer.drain()
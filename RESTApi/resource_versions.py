@@ -0,0 +1,169 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from dynamic_preferences.models import GlobalPreferenceModel
+
+from .models import Article, Comment, File, FooterLink, Gallery, GenericLink, Hardware, HardwareRental, \
+    ImageVariant, Profile, Project, Section, Sponsor, Tag
+from .signals import bulk_saved
+
+ARTICLE_MODELS = (Article, Comment, Gallery, GenericLink, ImageVariant, Profile, Tag, User)
+USER_MODELS = (User, Profile, GenericLink, Group, ImageVariant, Permission)
+PROJECT_MODELS = (Project, Gallery, GenericLink, ImageVariant, Profile, Section, User)
+
+# Which models each API resource embeds, directly or through a nested serializer.
+RESOURCE_MODELS = {
+    'articles': ARTICLE_MODELS + (GlobalPreferenceModel,),
+    'bootstrap': ARTICLE_MODELS + PROJECT_MODELS + (FooterLink, GlobalPreferenceModel, Sponsor),
+    'comments': ARTICLE_MODELS,
+    'files': (File,) + ARTICLE_MODELS + USER_MODELS,
+    'footer_links': (FooterLink,),
+    'gallery': (Gallery, ImageVariant),
+    'generic_links': ARTICLE_MODELS + USER_MODELS + (Project, Section),
+    'groups': (Group,),
+    'hardware_rentals': (HardwareRental, Hardware, GenericLink, ImageVariant, Profile, User),
+    'hardwares': (Hardware,),
+    'preferences': (GlobalPreferenceModel,),
+    'profiles': USER_MODELS,
+    'projects': PROJECT_MODELS + (GlobalPreferenceModel,),
+    'search': (Article, Project),
+    'section': (Section, Gallery, ImageVariant),
+    'sponsors': (Sponsor, ImageVariant),
+    'tags': (Tag,),
+    'users': USER_MODELS,
+}
+
+RESOURCE_DEPENDENCIES = {}
+for resource, models in RESOURCE_MODELS.items():
+    for model in models:
+        RESOURCE_DEPENDENCIES.setdefault(model, set()).add(resource)
+
+# Many-to-many tables invalidate whatever their owning model invalidates.
+M2M_OWNERS = {
+    Article.authors.through: Article,
+    Article.gallery.through: Article,
+    Article.tags.through: Article,
+    Group.permissions.through: Group,
+    Project.authors.through: Project,
+    Project.gallery.through: Project,
+    Section.gallery.through: Section,
+    User.groups.through: User,
+    User.user_permissions.through: User,
+}
+
+
+def version_cache():
+    # Stamps go to their own 'versions' alias when there is one, where culling cached responses
+    # cannot evict them.
+    return caches['versions' if 'versions' in settings.CACHES else 'default']
+
+
+def versions_are_shared():
+    # A version bump only reaches other workers through a cache they all read; with a process-local
+    # backend every worker would keep validating its own stale stamps.
+    return not isinstance(version_cache(), (DummyCache, LocMemCache))
+
+
+def _version_key(resource):
+    return f'resource-version:{resource}'
+
+
+def get_versions(resources):
+    cache = version_cache()
+    keys = {_version_key(resource): resource for resource in resources}
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        # Start from the current time so a restarted cache never repeats an older version.
+        now = int(time.time() * 1000)
+        for key in missing:
+            cache.add(key, now, None)
+        versions.update(cache.get_many(missing))
+    return {keys[key]: versions.get(key, 0) for key in keys}
+
+
+def get_version(resource):
+    return get_versions([resource])[resource]
+
+
+class VersionedSnapshot:
+    # A value kept in process memory and reloaded once its version stamp moves. The stamp is looked
+    # up at most every VERSION_CHECK_INTERVAL seconds, so most reads cost no cache round trip;
+    # writes in this process call clear() and are seen at once.
+    def __init__(self, resource, load):
+        self.resource = resource
+        self.load = load
+        self._lock = threading.Lock()
+        self._state = None
+
+    def get(self):
+        state = self._state
+        now = time.monotonic()
+        if state is not None and now - state[1] < getattr(settings, 'VERSION_CHECK_INTERVAL', 5):
+            return state[2]
+        version = get_version(self.resource)
+        with self._lock:
+            state = self._state
+            if state is None or state[0] != version:
+                state = (version, now, self.load())
+            else:
+                state = (version, now, state[2])
+            self._state = state
+        return state[2]
+
+    def clear(self):
+        self._state = None
+
+
+def bump_versions(resources):
+    cache = version_cache()
+    now = int(time.time() * 1000)
+    current = cache.get_many([_version_key(resource) for resource in resources])
+    cache.set_many({
+        _version_key(resource): max(now, current.get(_version_key(resource), 0) + 1)
+        for resource in resources
+    }, None)
+
+
+def _invalidate(resources):
+    transaction.on_commit(lambda: bump_versions(resources))
+
+
+def invalidate_models(models):
+    # For writes that bypass signals, e.g. QuerySet.update() in management commands.
+    resources = set()
+    for model in models:
+        resources |= RESOURCE_DEPENDENCIES.get(model, set())
+    if resources:
+        _invalidate(resources)
+
+
+# Logging in stamps User.last_login and nothing any resource serializes.
+IGNORED_UPDATE_FIELDS = frozenset({'last_login'})
+
+
+def _model_changed(sender, update_fields=None, **kwargs):
+    if update_fields and IGNORED_UPDATE_FIELDS.issuperset(update_fields):
+        return
+    _invalidate(RESOURCE_DEPENDENCIES[sender])
+
+
+def _m2m_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _invalidate(RESOURCE_DEPENDENCIES[M2M_OWNERS[sender]])
+
+
+for model in RESOURCE_DEPENDENCIES:
+    post_save.connect(_model_changed, sender=model, dispatch_uid=f'resource_versions_save_{model.__name__}')
+    post_delete.connect(_model_changed, sender=model, dispatch_uid=f'resource_versions_delete_{model.__name__}')
+    bulk_saved.connect(_model_changed, sender=model, dispatch_uid=f'resource_versions_bulk_{model.__name__}')
+
+for through in M2M_OWNERS:
+    m2m_changed.connect(_m2m_changed, sender=through, dispatch_uid=f'resource_versions_m2m_{through.__name__}')
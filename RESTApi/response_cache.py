@@ -0,0 +1,101 @@
+import hashlib
+import os
+import threading
+from collections import Counter
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.exceptions import NotAcceptable
+
+from .conditional import ConditionalGetMixin
+from .resource_versions import get_version, versions_are_shared
+
+CACHED_RESOURCES = ('articles', 'bootstrap', 'projects', 'search', 'section', 'sponsors', 'footer_links', 'tags')
+
+
+def is_anonymous_read(request):
+    return (request.method in ('GET', 'HEAD')
+            and 'HTTP_AUTHORIZATION' not in request.META
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES)
+
+
+# Query parameters every cached view may read: sparse fieldsets, ?ids= and both paginations. Views
+# reading more extend cache_query_params; anything else (tracking tags, cache busters) shares the entry.
+CACHE_QUERY_PARAMS = ('fields', 'expand', 'ids', 'limit', 'offset', 'cursor', 'pagination', 'count')
+
+
+def response_cache_key(resource, renderer_format, request, params=CACHE_QUERY_PARAMS):
+    query = urlencode(sorted((name, values) for name, values in request.GET.lists() if name in params), doseq=True)
+    digest = hashlib.md5(f'{request.path}?{query}'.encode('utf-8')).hexdigest()
+    return f'response:{resource}:{get_version(resource)}:{renderer_format}:{digest}'
+
+
+# Hit and miss counters of this worker process; counting in the shared cache cost two writes a request.
+_stats_lock = threading.Lock()
+_stats = Counter()
+
+
+def record(resource, outcome):
+    with _stats_lock:
+        _stats[resource, outcome] += 1
+
+
+def get_stats():
+    with _stats_lock:
+        counts = dict(_stats)
+    stats = {
+        resource: {outcome: counts.get((resource, outcome), 0) for outcome in ('hits', 'misses')}
+        for resource in CACHED_RESOURCES
+    }
+    return {
+        'pid': os.getpid(),
+        'hits': sum(resource['hits'] for resource in stats.values()),
+        'misses': sum(resource['misses'] for resource in stats.values()),
+        'resources': stats,
+    }
+
+
+class AnonymousResponseCacheMixin(ConditionalGetMixin):
+    cache_query_params = CACHE_QUERY_PARAMS
+
+    def dispatch(self, request, *args, **kwargs):
+        if not is_anonymous_read(request) or not versions_are_shared():
+            return super().dispatch(request, *args, **kwargs)
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        try:
+            renderer, media_type = self.perform_content_negotiation(self.initialize_request(request, *args, **kwargs))
+        except NotAcceptable:
+            return super().dispatch(request, *args, **kwargs)
+
+        key = response_cache_key(self.cache_resource, renderer.format, request, self.cache_query_params)
+        cached = cache.get(key)
+        if cached is not None:
+            record(self.cache_resource, 'hits')
+            response = get_conditional_response(request, etag=cached['etag'],
+                                                last_modified=parse_http_date_safe(cached['last_modified']))
+            if response is None:
+                response = HttpResponse(cached['content'], content_type=cached['content_type'])
+            response['ETag'] = cached['etag']
+            response['Last-Modified'] = cached['last_modified']
+            response['Cache-Control'] = 'no-cache'
+            response['X-Cache'] = 'HIT'
+            return response
+
+        record(self.cache_resource, 'misses')
+        response = super().dispatch(request, *args, **kwargs)
+        accepted_renderer = getattr(response, 'accepted_renderer', None)
+        if response.status_code == 200 and accepted_renderer is not None \
+                and accepted_renderer.format == renderer.format:
+            response.render()
+            cache.set(key, {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': response['ETag'],
+                'last_modified': response['Last-Modified'],
+            }, settings.RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
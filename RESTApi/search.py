@@ -0,0 +1,276 @@
+import re
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from django.utils.html import escape
+
+from .models import Article, Project
+from .signals import bulk_saved
+
+SEARCH_TABLE = 'RESTApi_search'
+
+# Rows are keyed by rowid = pk * len(SEARCH_KINDS) + kind index, so updates and deletes
+# hit the rowid b-tree instead of scanning the unindexed columns.
+SEARCH_KINDS = ('article', 'project')
+SEARCH_MODELS = {'article': Article, 'project': Project}
+
+TITLE_WEIGHT = 10.0
+TEXT_WEIGHT = 1.0
+SNIPPET_TOKENS = 16
+SNIPPET_START = '<mark>'
+SNIPPET_END = '</mark>'
+SNIPPET_ELLIPSIS = '…'
+# FTS5 marks hits with these control characters; the snippet is HTML-escaped before they become <mark> tags.
+_HIT_START = '\x02'
+_HIT_END = '\x03'
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def _kind_of(model):
+    for kind, kind_model in SEARCH_MODELS.items():
+        if issubclass(model, kind_model):
+            return kind
+    return None
+
+
+def _rowid(kind, pk):
+    return pk * len(SEARCH_KINDS) + SEARCH_KINDS.index(kind)
+
+
+def render_snippet(snippet):
+    return escape(snippet).replace(_HIT_START, SNIPPET_START).replace(_HIT_END, SNIPPET_END)
+
+
+def parse_terms(query):
+    return _TOKEN.findall(query or '')
+
+
+# Lazy result sequence: LimitOffsetPagination counts it and slices one page out of it.
+class SearchResults:
+    def __init__(self, backend, terms, kinds):
+        self.backend = backend
+        self.terms = terms
+        self.kinds = kinds
+
+    def count(self):
+        if not self.terms:
+            return 0
+        return self.backend.count(self.terms, self.kinds)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice) or item.step is not None:
+            raise TypeError('SearchResults only supports plain slices')
+        if not self.terms:
+            return []
+        start = item.start or 0
+        return self.backend.search(self.terms, self.kinds, start, item.stop - start)
+
+
+class FTS5Backend:
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def ensure_table(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SEARCH_TABLE])
+            if cursor.fetchone():
+                return False
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE "{SEARCH_TABLE}" USING fts5('
+                f'kind UNINDEXED, object_id UNINDEXED, title, text, '
+                f"tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+        return True
+
+    def index(self, kind, instance):
+        self.index_many(kind, [instance])
+
+    def index_many(self, kind, instances):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM "{SEARCH_TABLE}" WHERE rowid = %s',
+                               [[_rowid(kind, instance.pk)] for instance in instances])
+            cursor.executemany(
+                f'INSERT INTO "{SEARCH_TABLE}" (rowid, kind, object_id, title, text) VALUES (%s, %s, %s, %s, %s)',
+                [[_rowid(kind, instance.pk), kind, instance.pk, instance.title, instance.text]
+                 for instance in instances])
+
+    def remove(self, kind, pk):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM "{SEARCH_TABLE}" WHERE rowid = %s', [_rowid(kind, pk)])
+
+    def rebuild(self):
+        indexed = 0
+        with transaction.atomic(using=self.using), self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM "{SEARCH_TABLE}"')
+            for kind, model in SEARCH_MODELS.items():
+                rows = [
+                    (_rowid(kind, pk), kind, pk, title, text)
+                    for pk, title, text in model._default_manager.using(self.using)
+                    .values_list('pk', 'title', 'text').iterator()
+                ]
+                cursor.executemany(
+                    f'INSERT INTO "{SEARCH_TABLE}" (rowid, kind, object_id, title, text) '
+                    f'VALUES (%s, %s, %s, %s, %s)', rows)
+                indexed += len(rows)
+            cursor.execute(f'INSERT INTO "{SEARCH_TABLE}" ("{SEARCH_TABLE}") VALUES (\'optimize\')')
+        return indexed
+
+    def match_expression(self, terms):
+        # Every term is quoted so user input can never be read as FTS5 query syntax;
+        # the last one is a prefix so results show up while the user is still typing.
+        quoted = ['"%s"' % term.replace('"', '""') for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def _where(self, terms, kinds):
+        params = [self.match_expression(terms)]
+        where = f'"{SEARCH_TABLE}" MATCH %s'
+        if len(kinds) < len(SEARCH_KINDS):
+            where += ' AND kind IN (%s)' % ', '.join(['%s'] * len(kinds))
+            params.extend(kinds)
+        return where, params
+
+    def count(self, terms, kinds):
+        where, params = self._where(terms, kinds)
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM "{SEARCH_TABLE}" WHERE {where}', params)
+            return cursor.fetchone()[0]
+
+    def search(self, terms, kinds, offset, limit):
+        where, params = self._where(terms, kinds)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT kind, object_id, title, '
+                f'snippet("{SEARCH_TABLE}", 3, %s, %s, %s, %s), '
+                f'bm25("{SEARCH_TABLE}", 0, 0, %s, %s) AS rank '
+                f'FROM "{SEARCH_TABLE}" WHERE {where} ORDER BY rank LIMIT %s OFFSET %s',
+                [_HIT_START, _HIT_END, SNIPPET_ELLIPSIS, SNIPPET_TOKENS, TITLE_WEIGHT, TEXT_WEIGHT]
+                + params + [limit, offset])
+            return [
+                {'type': kind, 'id': object_id, 'title': title, 'snippet': render_snippet(snippet), 'rank': -rank}
+                for kind, object_id, title, snippet, rank in cursor.fetchall()
+            ]
+
+
+# Fallback for databases without FTS5: substring scans, title matches ranked first.
+class LikeBackend:
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+
+    def ensure_table(self):
+        return False
+
+    def index(self, kind, instance):
+        pass
+
+    def index_many(self, kind, instances):
+        pass
+
+    def remove(self, kind, pk):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def _querysets(self, terms, kinds):
+        for kind in kinds:
+            condition = Q()
+            for term in terms:
+                condition &= Q(title__icontains=term) | Q(text__icontains=term)
+            yield kind, SEARCH_MODELS[kind]._default_manager.using(self.using).filter(condition)
+
+    def count(self, terms, kinds):
+        return sum(queryset.count() for _, queryset in self._querysets(terms, kinds))
+
+    def search(self, terms, kinds, offset, limit):
+        hits = []
+        for kind, queryset in self._querysets(terms, kinds):
+            for pk, title, text in queryset.order_by('-pk').values_list('pk', 'title', 'text')[:offset + limit]:
+                score = sum(title.lower().count(term.lower()) * TITLE_WEIGHT
+                            + text.lower().count(term.lower()) * TEXT_WEIGHT for term in terms)
+                hits.append({'type': kind, 'id': pk, 'title': title, 'snippet': self.snippet(text, terms),
+                             'rank': score})
+        hits.sort(key=lambda hit: -hit['rank'])
+        return hits[offset:offset + limit]
+
+    def snippet(self, text, terms):
+        words = text.split()
+        lowered = [term.lower() for term in terms]
+        first = next((i for i, word in enumerate(words) if any(term in word.lower() for term in lowered)), 0)
+        start = max(0, first - SNIPPET_TOKENS // 2)
+        window = words[start:start + SNIPPET_TOKENS]
+        marked = [
+            f'{SNIPPET_START}{escape(word)}{SNIPPET_END}' if any(term in word.lower() for term in lowered)
+            else escape(word)
+            for word in window
+        ]
+        prefix = SNIPPET_ELLIPSIS if start > 0 else ''
+        suffix = SNIPPET_ELLIPSIS if start + SNIPPET_TOKENS < len(words) else ''
+        return prefix + ' '.join(marked) + suffix
+
+
+_fts5_available = {}
+
+
+def _has_fts5(using):
+    if using not in _fts5_available:
+        connection = connections[using]
+        available = False
+        if connection.vendor == 'sqlite':
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+                    available = bool(cursor.fetchone()[0])
+                    if not available:
+                        cursor.execute('CREATE VIRTUAL TABLE temp."RESTApi_search_probe" USING fts5(probe)')
+                        cursor.execute('DROP TABLE temp."RESTApi_search_probe"')
+                        available = True
+            except OperationalError:
+                available = False
+        _fts5_available[using] = available
+    return _fts5_available[using]
+
+
+def get_backend(using=DEFAULT_DB_ALIAS):
+    return FTS5Backend(using) if _has_fts5(using) else LikeBackend(using)
+
+
+def search(query, kinds=SEARCH_KINDS, using=DEFAULT_DB_ALIAS):
+    return SearchResults(get_backend(using), parse_terms(query), kinds)
+
+
+@receiver(post_migrate)
+def create_search_index(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    if sender.name != 'RESTApi':
+        return
+    backend = get_backend(using)
+    if backend.ensure_table():
+        backend.rebuild()
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=Project)
+def index_search_document(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    get_backend(using).index(_kind_of(sender), instance)
+
+
+@receiver(bulk_saved, sender=Article)
+@receiver(bulk_saved, sender=Project)
+def index_search_documents(sender, instances, using=DEFAULT_DB_ALIAS, **kwargs):
+    get_backend(using).index_many(_kind_of(sender), instances)
+
+
+@receiver(post_delete, sender=Article)
+@receiver(post_delete, sender=Project)
+def remove_search_document(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    get_backend(using).remove(_kind_of(sender), instance.pk)
@@ -1,14 +1,26 @@
 from allauth.account.adapter import get_adapter
 from allauth.account.utils import setup_user_email
+from django.conf import settings
 from django.contrib.auth.models import User, Group
+from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from rest_auth.registration.serializers import RegisterSerializer
 from rest_framework import serializers
 from .models import Profile, ProfileLink, Article, Comment, Tag, \
     File, HardwareRental, Hardware, Project, \
-    Sponsor, Section, GenericLink, Gallery, FooterLink  # ArticleTag, ArticleAuthor
+    Sponsor, Section, GenericLink, Gallery, FooterLink, ImageVariant, UploadSession  # ArticleTag, ArticleAuthor
 
 from sorl_thumbnail_serializer.fields import HyperlinkedSorlImageField
 
+from .bulk import BulkListSerializer
+from .comment_tree import COMMENT_TREE_MAX_DEPTH, COMMENT_TREE_MAX_REPLIES
+from .fieldsets import SparseFieldsetMixin
+from .generic_relations import prefetch_generic
+from .image_processing import get_geometry
+from .permission_catalogue import get_permission_catalogue, prefetch_permissions
+from .query_plans import eager_load
+
 
 class RegisterWithFullNameSerializer(RegisterSerializer):
     first_name = serializers.CharField(required=True, max_length=150)
@@ -24,18 +36,39 @@ class RegisterWithFullNameSerializer(RegisterSerializer):
         }
 
 
-class GenericLinkSerializer(serializers.ModelSerializer):
+class GenericLinkSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = GenericLink
         fields = ('id', 'link', 'link_type')
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserListSerializer(serializers.ListSerializer):
+    def get_users(self, data):
+        if 'permissions' not in self.child.fields:
+            return []
+        return data
+
+    def to_representation(self, data):
+        iterable = list(data.all() if isinstance(data, models.Manager) else data)
+        prefetch_permissions(self.get_users(iterable))
+        return super(UserListSerializer, self).to_representation(iterable)
+
+
+class ProfileListSerializer(UserListSerializer):
+    def get_users(self, data):
+        user = self.child.fields.get('user')
+        if not isinstance(user, UserSerializer) or 'permissions' not in user.fields:
+            return []
+        return [profile.user for profile in data]
+
+
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     is_admin_user = serializers.SerializerMethodField()
     permissions = serializers.SerializerMethodField()
 
     class Meta:
         model = User
+        list_serializer_class = UserListSerializer
         fields = ('id', 'username', 'email', 'groups', 'profile', 'password',
                   'first_name', 'last_name', 'is_admin_user', 'permissions')
         read_only_fields = ('profile', 'groups')
@@ -58,13 +91,25 @@ class UserSerializer(serializers.ModelSerializer):
         return obj.is_staff
 
     def get_permissions(self, obj):
-        all_permissions = filter(lambda x: x.startswith('RESTApi') or x.startswith('auth') and not x.startswith('authtoken'), User(is_superuser=True).get_all_permissions())
+        prefetch_permissions([obj])
         user_permissions = obj.get_all_permissions()
 
-        return {p: p in user_permissions for p in all_permissions}
+        return {p: p in user_permissions for p in get_permission_catalogue()}
+
+
+class ImageVariantSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    url = serializers.FileField(source='file', read_only=True)
+    type = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImageVariant
+        fields = ('url', 'width', 'height', 'type')
+
+    def get_type(self, obj):
+        return f'image/{obj.format}'
 
 
-class ProfileWithoutUserSerializer(serializers.ModelSerializer):
+class ProfileWithoutUserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     links = GenericLinkSerializer(many=True)
 
     class Meta:
@@ -72,7 +117,7 @@ class ProfileWithoutUserSerializer(serializers.ModelSerializer):
         fields = ('id', 'description', 'links', 'index_number')
 
 
-class ShortUserSerializer(serializers.ModelSerializer):
+class ShortUserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     profile = ProfileWithoutUserSerializer()
 
     class Meta:
@@ -87,44 +132,62 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         read_only_fields = ('profile', 'groups', 'username')
 
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Group
         fields = ('id', 'name')
 
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     links = GenericLinkSerializer(read_only=True, many=True)
+    srcset = ImageVariantSerializer(source='variants', many=True, read_only=True)
 
     class Meta:
         model = Profile
-        fields = ('id', 'user', 'description', 'avatar', 'index_number', 'links')
+        list_serializer_class = ProfileListSerializer
+        fields = ('id', 'user', 'description', 'avatar', 'srcset', 'index_number', 'links')
+
+
+class GalleryThumbnailField(HyperlinkedSorlImageField):
+    # Serves the original image until the background worker has generated the thumbnails,
+    # so a list render never resizes images inside the request.
+    required_columns = ('thumbnails_ready',)
+
+    def __init__(self, name, *args, **kwargs):
+        geometry, options = get_geometry(name)
+        super().__init__(geometry, options, *args, **kwargs)
+
+    def to_representation(self, value):
+        if value and not getattr(value.instance, 'thumbnails_ready', True):
+            return serializers.ImageField.to_representation(self, value)
+        return super().to_representation(value)
 
 
-class GallerySerializer(serializers.ModelSerializer):
-    thumbnail = HyperlinkedSorlImageField(
-        '512x512',
-        options={"crop": "center"},
+class GallerySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    thumbnail = GalleryThumbnailField(
+        'thumbnail',
         source='image',
         read_only=True
     )
+    srcset = ImageVariantSerializer(source='variants', many=True, read_only=True)
 
     class Meta:
         model = Gallery
-        fields = ('id', 'image', 'thumbnail')
+        fields = ('id', 'image', 'thumbnail', 'srcset')
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ('id', 'name')
+        list_serializer_class = BulkListSerializer
 
 
-class ArticleSerializer(serializers.ModelSerializer):
+class ArticleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     creator = ShortUserSerializer()
     tags = TagSerializer(many=True)
-    comments_number = serializers.SerializerMethodField()
+    comments_number = serializers.IntegerField(source='comments_count', read_only=True)
     gallery = GallerySerializer(many=True)
     authors = ShortUserSerializer(many=True)
     links = GenericLinkSerializer(many=True)
@@ -136,26 +199,42 @@ class ArticleSerializer(serializers.ModelSerializer):
             'publication_date', 'creator', 'authors', 'tags', 'comments_number',
             'gallery', 'links')
 
-    def get_comments_number(self, obj):
-        return obj.comments.count()
-
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = ShortUserSerializer()
-    article = ArticleSerializer()
+    replies_count = serializers.SerializerMethodField()
     children = serializers.SerializerMethodField()
 
     class Meta:
         model = Comment
-        fields = ('id', 'text', 'creation_date', 'article', 'parent', 'user', 'children')
-        depth = 2
-    
+        fields = ('id', 'text', 'creation_date', 'article', 'parent', 'user', 'replies_count', 'children')
+
+    def get_replies_count(self, obj):
+        return len(getattr(obj, 'replies', ()))
+
     def get_children(self, obj):
-        child = Comment.objects.filter(parent=obj).order_by('-creation_date')
-        serializer = CommentSerializer(instance=child, many=True)
+        depth = self.context.get('depth', 1)
+        if depth >= self.context.get('max_depth', COMMENT_TREE_MAX_DEPTH):
+            return []
+        replies = getattr(obj, 'replies', [])[:self.context.get('max_replies', COMMENT_TREE_MAX_REPLIES)]
+        serializer = CommentSerializer(instance=replies, many=True, context=dict(self.context, depth=depth + 1),
+                                       **self.fieldset)
         return serializer.data
 
 
+class CommentFeedSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    user = ShortUserSerializer()
+    replies_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ('id', 'text', 'creation_date', 'article', 'parent', 'user', 'replies_count')
+        annotations = {'replies_count': Coalesce(Subquery(
+            Comment.objects.filter(parent=OuterRef('pk')).order_by().values('parent')
+            .annotate(count=Count('pk')).values('count')
+        ), 0)}
+
+
 class CommentSaveSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
@@ -173,9 +252,10 @@ class ArticleSaveSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'alias', 'title', 'text', 'creation_date', 'publication_date',
             'creator', 'tags', 'authors', 'gallery')
+        list_serializer_class = BulkListSerializer
 
 
-class FileSerializer(serializers.ModelSerializer):
+class FileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = ProfileSerializer()
     article = ArticleSerializer()
 
@@ -190,7 +270,7 @@ class FileSaveSerializer(serializers.ModelSerializer):
         fields = ('id', 'creation_date', 'user', 'article')
 
 
-class HardwareSerializer(serializers.ModelSerializer):
+class HardwareSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Hardware
@@ -201,24 +281,25 @@ class HardwareSaveSerializer(serializers.ModelSerializer):
     class Meta:
         model = Hardware
         fields = ('id', 'name', 'description', 'serial_number', 'status')
+        list_serializer_class = BulkListSerializer
 
 
-class HardwareRentalSerializer(serializers.ModelSerializer):
+class HardwareRentalSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = ShortUserSerializer()
     hardware = HardwareSerializer()
 
     class Meta:
         model = HardwareRental
-        fields = ('id', 'rental_date', 'return_date', 'user', 'hardware', 'file')
+        fields = ('id', 'rental_date', 'return_date', 'returned_date', 'user', 'hardware', 'file', 'document_status')
 
 
 class HardwareRentalSaveSerializer(serializers.ModelSerializer):
     class Meta:
         model = HardwareRental
-        fields = ('id', 'rental_date', 'return_date', 'user', 'hardware')
+        fields = ('id', 'rental_date', 'return_date', 'returned_date', 'user', 'hardware', 'document_status')
 
 
-class SectionSerializer(serializers.ModelSerializer):
+class SectionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     gallery = GallerySerializer(many=True)
 
     class Meta:
@@ -232,7 +313,7 @@ class SectionSaveSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'description', 'isVisible', 'icon', 'gallery')
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     creator = ShortUserSerializer()
     section = SectionSerializer()
     authors = ShortUserSerializer(many=True)
@@ -253,40 +334,94 @@ class ProjectSaveSerializer(serializers.ModelSerializer):
         extra_kwargs = {'gallery': {'required': False}}
 
 
-class SponsorSerializer(serializers.ModelSerializer):
+class SponsorSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    srcset = ImageVariantSerializer(source='variants', many=True, read_only=True)
+
     class Meta:
         model = Sponsor
-        fields = ('id', 'name', 'image', 'url')
+        fields = ('id', 'name', 'logo', 'srcset', 'url')
+
+
+# Serializer for each model a generic link can point at.
+LINKED_OBJECT_SERIALIZERS = {
+    Article: ArticleSerializer,
+    Profile: ProfileSerializer,
+    Project: ProjectSerializer,
+}
 
 
 class GenericLinkObjectRelatedField(serializers.RelatedField):
     def to_representation(self, value):
-        if isinstance(value, Article):
-            serializer = ArticleSerializer(value)
-        elif isinstance(value, Profile):
-            serializer = ProfileSerializer(value)
-        elif isinstance(value, Project):
-            serializer = ProjectSerializer(value)
-        else:
+        serializer_class = LINKED_OBJECT_SERIALIZERS.get(type(value))
+        if serializer_class is None:
             raise Exception("Unknown type of object")
-        return serializer.data
-
-
-class GenericLinkBigSerializer(serializers.ModelSerializer):
+        # A list of links serializes every target once up front, see GenericLinkListSerializer.
+        representations = getattr(self.parent.parent, 'linked_representations', {})
+        key = (type(value), value.pk)
+        if key in representations:
+            return representations[key]
+        return serializer_class(value).data
+
+
+class GenericLinkListSerializer(serializers.ListSerializer):
+    # Loads the linked objects of a whole page with one query (and its prefetches) per content type,
+    # and serializes each distinct target once however many links point at it.
+    def to_representation(self, data):
+        iterable = list(data.all() if isinstance(data, models.Manager) else data)
+        self.linked_representations = {}
+        if 'linked_object' in self.child.fields:
+            targets = prefetch_generic(iterable, 'linked_object', self.get_linked_queryset)
+            for model, objects in targets.items():
+                serializer_class = LINKED_OBJECT_SERIALIZERS.get(model)
+                if serializer_class is None or not objects:
+                    continue
+                objects = list(objects.values())
+                for instance, representation in zip(objects, serializer_class(objects, many=True).data):
+                    self.linked_representations[(model, instance.pk)] = representation
+        return super(GenericLinkListSerializer, self).to_representation(iterable)
+
+    def get_linked_queryset(self, model):
+        serializer_class = LINKED_OBJECT_SERIALIZERS.get(model)
+        if serializer_class is None:
+            return model._default_manager.all()
+        return eager_load(model._default_manager.all(), serializer_class)
+
+
+class GenericLinkBigSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     linked_object = GenericLinkObjectRelatedField(read_only=True)
 
     class Meta:
         model = GenericLink
         fields = ('id', 'link', 'link_type', 'linked_object', 'content_type')
+        list_serializer_class = GenericLinkListSerializer
 
 
 class GenericLinkBigSaveSerializer(serializers.ModelSerializer):
     class Meta:
         model = GenericLink
-        fields = ('id', 'link', 'link_type', 'linked_object', 'content_type')
+        fields = ('id', 'link', 'link_type', 'content_type', 'object_id')
+        list_serializer_class = BulkListSerializer
 
 
-class FooterLinkSerializer(serializers.ModelSerializer):
+class FooterLinkSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = FooterLink
         fields = ('id', 'link', 'title', 'icon', 'color')
+        list_serializer_class = BulkListSerializer
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$')
+
+    class Meta:
+        model = UploadSession
+        fields = ('id', 'target', 'filename', 'size', 'sha256', 'offset', 'created')
+        read_only_fields = ('offset', 'created')
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.UPLOAD_SESSION_MAX_SIZE:
+            raise serializers.ValidationError("Size must be between 1 and %d bytes" % settings.UPLOAD_SESSION_MAX_SIZE)
+        return value
+
+    def validate_sha256(self, value):
+        return value.lower()
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent after bulk_create/bulk_update writes, which skip post_save and m2m_changed.
+# Arguments: "instances", the saved objects, and "created".
+bulk_saved = Signal()
@@ -0,0 +1,100 @@
+import gzip
+import mimetypes
+import os
+import re
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+# Content codings we keep precompressed files for, in order of preference, with their suffixes.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Build output names carry a content hash (app.11bc02ea.js), so they can be cached forever.
+_hashed_name = re.compile(r'\.[0-9a-f]{8,}\.')
+
+
+def is_hashed(path):
+    return bool(_hashed_name.search(os.path.basename(path)))
+
+
+def accepted_encodings(header):
+    accepted = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def compressors():
+    # Encoders for the content codings available here; brotli is optional. A zero gzip mtime keeps
+    # the output identical between builds.
+    available = {'gzip': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        available['br'] = lambda data: brotli.compress(data, quality=11)
+    return available
+
+
+def negotiate_encoding(header, available):
+    accepted = accepted_encodings(header)
+    best, best_quality = None, 0.0
+    for encoding, _ in ENCODINGS:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if encoding in available and quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def choose_encoding(header, path):
+    # Returns (content coding or None, path of the file to send).
+    suffixes = dict(ENCODINGS)
+    encoding = negotiate_encoding(header, [name for name, suffix in ENCODINGS if os.path.isfile(path + suffix)])
+    if encoding is None:
+        return None, path
+    return encoding, path + suffixes[encoding]
+
+
+def serve_file(request, path, document_root, cache_control=None):
+    try:
+        full_path = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    encoding, served_path = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING'), full_path)
+    stat = os.stat(served_path)
+    etag = '"%x-%x%s"' % (int(stat.st_mtime), stat.st_size, '-' + encoding if encoding else '')
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = FileResponse(open(served_path, 'rb'), filename=os.path.basename(full_path))
+        # Set after the fact: FileResponse re-guesses text/html types from the name of the file it sends.
+        content_type, _ = mimetypes.guess_type(full_path)
+        response['Content-Type'] = content_type or 'application/octet-stream'
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(stat.st_mtime)
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control or (IMMUTABLE if is_hashed(path) else REVALIDATE)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
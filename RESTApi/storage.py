@@ -0,0 +1,99 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+BLOB_PREFIX = 'blobs/'
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOB_PREFIX)
+
+
+def blob_name(digest, original_name):
+    extension = os.path.splitext(original_name)[1].lower()
+    return f'{BLOB_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def blob_digest(name):
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def add_reference(name, size, store=None):
+    from .models import Blob
+
+    # The transaction opens with a write, so the blob row stays locked (SQLite: the database) until
+    # commit; store() puts the file in place under that lock, where release_reference cannot race it.
+    with transaction.atomic():
+        if not Blob.objects.filter(name=name).update(references=F('references') + 1):
+            try:
+                with transaction.atomic():
+                    Blob.objects.create(name=name, size=size, references=1)
+            except IntegrityError:
+                Blob.objects.filter(name=name).update(references=F('references') + 1)
+        if store is not None:
+            store()
+
+
+def release_reference(name, remove=None):
+    # Returns True when nothing references the blob any more; remove() then deletes the file while
+    # the row is still locked, so a concurrent add_reference either sees the file or restores it.
+    from .models import Blob
+
+    with transaction.atomic():
+        Blob.objects.filter(name=name, references__gt=0).update(references=F('references') - 1)
+        released = Blob.objects.filter(name=name, references=0).delete()[0] > 0
+        if released and remove is not None:
+            remove()
+    return released
+
+
+# Stores every upload once, under the SHA-256 of its content. The name passed in only contributes
+# its extension; identical uploads resolve to the same blob, which is reference-counted so deleting
+# one owner never removes a shared file. A blob name never changes meaning, so its URL can be
+# cached forever.
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        directory = self.path(BLOB_PREFIX + 'tmp')
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        handle, temporary = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(handle, 'wb') as output:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    size += len(chunk)
+                    output.write(chunk)
+            name = blob_name(digest.hexdigest(), name)
+        except BaseException:
+            os.remove(temporary)
+            raise
+        path = self.path(name)
+
+        def store():
+            if os.path.exists(path):
+                os.remove(temporary)
+                return
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            os.replace(temporary, path)
+
+        try:
+            add_reference(name, size, store)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        return name
+
+    def delete(self, name):
+        if not is_blob(name):
+            return super().delete(name)
+        release_reference(name, lambda: super(ContentAddressedStorage, self).delete(name))
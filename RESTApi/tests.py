@@ -1,3 +1,1001 @@
-from django.test import TestCase
+import gzip
+import hashlib
+import io
+import os
+import re
+import shutil
+import struct
+import tempfile
+import zipfile
+import zlib
+from concurrent.futures import Future
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission, User
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from dynamic_preferences.registries import global_preferences_registry
+from PIL import Image
+from rest_framework.test import APIClient
+
+from . import image_processing, index_page, pdf_rendering, permission_catalogue, preferences, rental_documents, \
+    response_cache
+from .models import Article, Blob, Comment, File, FooterLink, Gallery, GenericLink, Hardware, HardwareRental, \
+    Project, Section, Sponsor, Tag, UploadSession
+from .resource_versions import bump_versions, get_version
+from .serializers import ArticleSerializer, ProfileSerializer, ProjectSerializer
+from .views import StaticFileView
+
+# Version stamps only work in a shared cache; with a local one the response cache and ETags are off,
+# which keeps query counts free of cache lookups.
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def png(color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (4, 4), color).save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue(), name='image.png')
+
+
+def make_article(creator, **fields):
+    fields.setdefault('title', 'Article')
+    fields.setdefault('alias', 'article')
+    fields.setdefault('text', 'Text')
+    fields.setdefault('creation_date', timezone.now())
+    fields.setdefault('publication_date', timezone.now())
+    return Article.objects.create(creator=creator, **fields)
+
+
+def make_hardware(name='Raspberry Pi', status=Hardware.AVAILABLE):
+    return Hardware.objects.create(name=name, description='', serial_number='SN-1', status=status)
+
+
+def populate(user, count):
+    # Rows for every list view, each with the relations its serializer nests.
+    start = Tag.objects.count()
+    for index in range(start, start + count):
+        tag = Tag.objects.create(name=f'tag {index}')
+        gallery = Gallery.objects.create(gallery_name=f'gallery {index}', image=f'gallery/{index}.png')
+        article = make_article(user, title=f'article {index}')
+        article.tags.add(tag)
+        article.authors.add(user)
+        article.gallery.add(gallery)
+        GenericLink.objects.create(link='https://example.com', link_type=GenericLink.GITHUB,
+                                   content_type=ContentType.objects.get_for_model(Article), object_id=article.pk)
+        root = Comment.objects.create(text='root', article=article, user=user)
+        Comment.objects.create(text='reply', parent=root, user=user)
+        section = Section.objects.create(name=f'section {index}', description='', isVisible=True)
+        section.gallery.add(gallery)
+        project = Project.objects.create(title=f'project {index}', text='', creation_date=timezone.now(),
+                                         creator=user, section=section)
+        project.authors.add(user)
+        project.gallery.add(gallery)
+        File.objects.create(user=user.profile, article=article)
+        FooterLink.objects.create(link='https://example.com', title='footer', icon='', color='')
+        hardware = make_hardware(f'hardware {index}')
+        HardwareRental.objects.create(user=user, hardware=hardware, rental_date=timezone.now())
+        User.objects.create_user(f'member {index}')
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+@mock.patch('RESTApi.image_processing.schedule_image_processing')
+class ListQueryCountTests(TestCase):
+    urls = (
+        '/api/articles/', '/api/projects/', '/api/comments/', '/api/profiles/', '/api/users/',
+        '/api/hardwares/', '/api/hardware_rentals/', '/api/gallery/', '/api/tags/', '/api/section/',
+        '/api/sponsors/', '/api/generic_links/', '/api/files/', '/api/footer_links/', '/api/bootstrap/',
+    )
+
+    def setUp(self):
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self, schedule):
+        populate(self.user, 2)
+        # The first requests load per-process caches such as the permission catalogue.
+        for url in self.urls:
+            self.count_queries(url)
+        before = {url: self.count_queries(url) for url in self.urls}
+        populate(self.user, 3)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), before[url])
+
+    def test_thumbnail_fieldset_does_not_query_per_row(self, schedule):
+        populate(self.user, 2)
+        self.count_queries('/api/gallery/?fields=id,thumbnail')
+        before = self.count_queries('/api/gallery/?fields=id,thumbnail')
+        populate(self.user, 3)
+        self.assertEqual(self.count_queries('/api/gallery/?fields=id,thumbnail'), before)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class CommentTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('author', password='password')
+        self.article = make_article(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_create_on_comment_list(self):
+        response = self.client.post('/api/comments/', {'text': 'First', 'article': self.article.pk,
+                                                       'user': self.user.pk}, format='json')
+        self.assertEqual(response.status_code, 201)
+        comment = Comment.objects.get(pk=response.data['id'])
+        self.assertEqual(comment.root_article_id, self.article.pk)
+        self.assertEqual(Article.objects.get(pk=self.article.pk).comments_count, 1)
+
+    def test_create_under_article(self):
+        url = f'/api/articles/{self.article.pk}/comments/'
+        root = self.client.post(url, {'text': 'Root', 'user': self.user.pk}, format='json')
+        self.assertEqual(root.status_code, 201)
+        self.assertEqual(root.data['article'], self.article.pk)
+        reply = self.client.post(url, {'text': 'Reply', 'user': self.user.pk, 'parent': root.data['id']},
+                                 format='json')
+        self.assertEqual(reply.status_code, 201)
+        self.assertEqual(Comment.objects.get(pk=reply.data['id']).root_article_id, self.article.pk)
+        self.assertEqual(Article.objects.get(pk=self.article.pk).comments_count, 2)
+
+        thread = self.client.get(url)
+        self.assertEqual(thread.data['results'][0]['children'][0]['text'], 'Reply')
+
+    def test_reply_must_belong_to_the_article(self):
+        other = make_article(self.user)
+        foreign = Comment.objects.create(text='Elsewhere', article=other, user=self.user)
+        response = self.client.post(f'/api/articles/{self.article.pk}/comments/',
+                                    {'text': 'Reply', 'user': self.user.pk, 'parent': foreign.pk}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_create_under_missing_article(self):
+        response = self.client.post('/api/articles/999/comments/', {'text': 'Lost', 'user': self.user.pk},
+                                    format='json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_moving_a_comment_moves_its_replies(self):
+        other = make_article(self.user)
+        root = Comment.objects.create(text='Root', article=self.article, user=self.user)
+        reply = Comment.objects.create(text='Reply', parent=root, user=self.user)
+        nested = Comment.objects.create(text='Nested', parent=reply, user=self.user)
+        response = self.client.put(f'/api/comments/{root.pk}/', {'text': 'Root', 'article': other.pk,
+                                                                 'user': self.user.pk}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(Comment.objects.filter(root_article=other).values_list('pk', flat=True)),
+                         {root.pk, reply.pk, nested.pk})
+        self.assertEqual(self.client.get(f'/api/articles/{self.article.pk}/comments/').data['results'], [])
+
+    def test_moving_a_comment_moves_its_count(self):
+        other = make_article(self.user)
+        root = Comment.objects.create(text='Root', article=self.article, user=self.user)
+        Comment.objects.create(text='Kept', article=self.article, user=self.user)
+        reply = Comment.objects.create(text='Reply', parent=root, user=self.user)
+        reply.parent, reply.article = None, other
+        reply.save()
+        self.assertEqual(Article.objects.get(pk=self.article.pk).comments_count, 2)
+        self.assertEqual(Article.objects.get(pk=other.pk).comments_count, 1)
+        root.article = other
+        root.save()
+        self.assertEqual(Article.objects.get(pk=self.article.pk).comments_count, 1)
+        self.assertEqual(Article.objects.get(pk=other.pk).comments_count, 2)
+
+    def test_anonymous_cannot_comment(self):
+        response = APIClient().post('/api/comments/', {'text': 'Hi', 'article': self.article.pk,
+                                                       'user': self.user.pk}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+
+class PermissionCatalogueTests(TestCase):
+    def setUp(self):
+        permission_catalogue._permission_names.clear()
+
+    def test_catalogue_is_served_from_memory(self):
+        permission_catalogue.get_permission_catalogue()
+        with self.assertNumQueries(0):
+            catalogue = permission_catalogue.get_permission_catalogue()
+        self.assertIn('RESTApi.add_article', catalogue)
+
+    @override_settings(VERSION_CHECK_INTERVAL=0)
+    def test_version_bump_from_another_worker_reloads_the_catalogue(self):
+        permission_catalogue.get_permission_catalogue()
+        content_type = ContentType.objects.get_for_model(Article)
+        # bulk_create skips the signals, like a migration run by another process.
+        Permission.objects.bulk_create([Permission(codename='publish_article', name='Can publish',
+                                                   content_type=content_type)])
+        self.assertNotIn('RESTApi.publish_article', permission_catalogue.get_permission_catalogue())
+        bump_versions([permission_catalogue.CATALOGUE_VERSION])
+        self.assertIn('RESTApi.publish_article', permission_catalogue.get_permission_catalogue())
+
+    def test_permissions_of_many_users_load_in_one_batch(self):
+        group = Group.objects.create(name='editors')
+        group.permissions.add(Permission.objects.get(codename='change_article'))
+        users = [User.objects.create_user(f'member {index}') for index in range(3)]
+        users[0].groups.add(group)
+        users[1].user_permissions.add(Permission.objects.get(codename='add_tag'))
+        permission_catalogue.get_permission_names()
+        with self.assertNumQueries(2):
+            permission_catalogue.prefetch_permissions(users)
+        with self.assertNumQueries(0):
+            self.assertEqual(users[0].get_all_permissions(), {'RESTApi.change_article'})
+            self.assertEqual(users[1].get_all_permissions(), {'RESTApi.add_tag'})
+            self.assertEqual(users[2].get_all_permissions(), set())
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('author')
+        now = timezone.now()
+        # Ties and NULL publication dates are where keyset positions go wrong.
+        dates = [now, now, now - timedelta(days=1), None, None, now - timedelta(days=2), now]
+        self.articles = [make_article(self.user, publication_date=date) for date in dates]
+
+    def walk(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(article['id'] for article in response.data['results'])
+            url = response.data['next']
+        return seen
+
+    def test_cursor_walk_returns_every_row_once_in_order(self):
+        seen = self.walk('/api/articles/?pagination=keyset&limit=2')
+        expected = sorted(self.articles, key=lambda article: (article.publication_date is None,
+                                                              -(article.publication_date or timezone.now()).timestamp(),
+                                                              -article.pk))
+        self.assertEqual(seen, [article.pk for article in expected])
+
+    def test_rows_inserted_during_the_walk_do_not_shift_pages(self):
+        first = self.client.get('/api/articles/?pagination=keyset&limit=3')
+        make_article(self.user, publication_date=timezone.now() + timedelta(days=1))
+        rest = self.walk(first.data['next'])
+        self.assertEqual(len(first.data['results']) + len(rest), len(self.articles))
+        self.assertFalse(set(article['id'] for article in first.data['results']) & set(rest))
+
+    def test_count_is_opt_in(self):
+        self.assertNotIn('count', self.client.get('/api/articles/?pagination=keyset').data)
+        self.assertEqual(self.client.get('/api/articles/?pagination=keyset&count=true').data['count'], 7)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/articles/?cursor=garbage').status_code, 404)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class BulkWriteTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_tags(self):
+        response = self.client.post('/api/tags/', [{'name': 'one'}, {'name': 'two'}], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([tag['name'] for tag in response.data], ['one', 'two'])
+        self.assertEqual(sorted(Tag.objects.values_list('pk', flat=True)), sorted(tag['id'] for tag in response.data))
+
+    def test_bulk_create_articles_with_many_to_many(self):
+        tags = [Tag.objects.create(name='a'), Tag.objects.create(name='b')]
+        item = {'title': 'Bulk', 'alias': 'bulk', 'text': 'Text', 'creation_date': timezone.now().isoformat(),
+                'creator': self.user.pk, 'tags': [tag.pk for tag in tags]}
+        response = self.client.post('/api/articles/', [item, dict(item, tags=[tags[0].pk])], format='json')
+        self.assertEqual(response.status_code, 201)
+        created = Article.objects.order_by('pk')
+        self.assertEqual([article.tags.count() for article in created], [2, 1])
+
+    def test_bulk_create_is_all_or_nothing(self):
+        response = self.client.post('/api/tags/', [{'name': 'fine'}, {'name': 'x' * 51}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_update(self):
+        tags = [Tag.objects.create(name='a'), Tag.objects.create(name='b')]
+        response = self.client.patch('/api/tags/', [{'id': tags[1].pk, 'name': 'B'}, {'id': tags[0].pk, 'name': 'A'}],
+                                     format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(Tag.objects.values_list('name', flat=True)), ['A', 'B'])
+
+    def test_bulk_update_rejects_unknown_ids(self):
+        tag = Tag.objects.create(name='a')
+        response = self.client.patch('/api/tags/', [{'id': tag.pk, 'name': 'A'}, {'id': 999, 'name': 'B'}],
+                                     format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Tag.objects.get(pk=tag.pk).name, 'a')
+
+    def test_bulk_writes_require_permission(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('member'))
+        self.assertEqual(client.post('/api/tags/', [{'name': 'one'}], format='json').status_code, 403)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class MultiGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('author')
+        self.articles = [make_article(self.user, title=f'article {index}') for index in range(3)]
+
+    def test_ids_keep_the_requested_order_and_report_missing(self):
+        ids = [self.articles[2].pk, self.articles[0].pk, 999]
+        response = self.client.get('/api/articles/', {'ids': ','.join(map(str, ids))})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([article['id'] for article in response.data['results']], ids[:2])
+        self.assertEqual(response.data['missing'], [999])
+
+    def test_ids_are_fetched_in_one_query(self):
+        tags = [Tag.objects.create(name=f'tag {index}') for index in range(3)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tags/', {'ids': ','.join(str(tag.pk) for tag in tags)})
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(len(queries), 1)
+
+    def test_invalid_ids(self):
+        self.assertEqual(self.client.get('/api/articles/', {'ids': '1,two'}).status_code, 400)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class BootstrapTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('author')
+        for index in range(7):
+            make_article(self.user, title=f'article {index}')
+        Sponsor.objects.create(name='Sponsor', url='https://example.com', logo='sponsor_logo/logo.png')
+        FooterLink.objects.create(link='https://example.com', title='footer', icon='', color='')
+
+    def test_payload(self):
+        response = self.client.get('/api/bootstrap/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data), ['section', 'sponsors', 'footer_links', 'preferences', 'articles',
+                                               'projects'])
+        self.assertEqual(len(response.data['sponsors']), 1)
+        self.assertEqual(len(response.data['footer_links']), 1)
+        # Homepage lists are as long as general__default_items_on_page (5 by default).
+        self.assertEqual(len(response.data['articles']), 5)
+
+    def test_only_public_preferences_are_sent(self):
+        preferences = self.client.get('/api/bootstrap/').data['preferences']
+        self.assertEqual(preferences['general__default_items_on_page'], 5)
+        self.assertNotIn('general__registration_mode', preferences)
+
+
+class GenericLinkTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('author')
+        self.section = Section.objects.create(name='section', description='', isVisible=True)
+
+    def link(self, target):
+        return GenericLink.objects.create(link='https://example.com', link_type=GenericLink.OTHER,
+                                          content_type=ContentType.objects.get_for_model(target),
+                                          object_id=target.pk)
+
+    def project(self, title='project'):
+        return Project.objects.create(title=title, text='', creation_date=timezone.now(), creator=self.user,
+                                      section=self.section)
+
+    def linked_objects(self):
+        response = self.client.get('/api/generic_links/')
+        self.assertEqual(response.status_code, 200)
+        return [link['linked_object'] for link in response.data]
+
+    def test_targets_are_serialized_by_content_type(self):
+        article, project = make_article(self.user), self.project()
+        for target in (article, self.user.profile, project, article):
+            self.link(target)
+        GenericLink.objects.create(link='https://example.com', link_type=GenericLink.OTHER,
+                                   content_type=ContentType.objects.get_for_model(Project), object_id=project.pk + 1)
+        self.assertEqual(self.linked_objects(), [
+            ArticleSerializer(article).data, ProfileSerializer(self.user.profile).data,
+            ProjectSerializer(project).data, ArticleSerializer(article).data, None,
+        ])
+
+    def test_targets_load_with_one_query_per_content_type(self):
+        self.link(make_article(self.user))
+        self.link(self.project())
+        self.linked_objects()
+        with CaptureQueriesContext(connection) as before:
+            self.linked_objects()
+        for index in range(3):
+            self.link(make_article(self.user, title=f'article {index}', alias=f'article-{index}'))
+            self.link(self.project(f'project {index}'))
+        with CaptureQueriesContext(connection) as after:
+            self.linked_objects()
+        self.assertEqual(len(after), len(before))
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+@mock.patch('RESTApi.views.schedule_document')
+class HardwareReservationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.hardware = make_hardware()
+
+    def rental(self, hardware, **fields):
+        return dict({'user': self.user.pk, 'hardware': hardware.pk, 'rental_date': timezone.now().isoformat()},
+                    **fields)
+
+    def test_reserve_marks_hardware_rented(self, schedule):
+        response = self.client.post('/api/hardware_rentals/', self.rental(self.hardware), format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Hardware.objects.get(pk=self.hardware.pk).status, Hardware.RENTED)
+
+    def test_second_reservation_conflicts(self, schedule):
+        self.client.post('/api/hardware_rentals/', self.rental(self.hardware), format='json')
+        response = self.client.post('/api/hardware_rentals/', self.rental(self.hardware), format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(HardwareRental.objects.count(), 1)
+
+    def test_unavailable_hardware_conflicts(self, schedule):
+        hardware = make_hardware(status=Hardware.UNAVAILABLE)
+        response = self.client.post('/api/hardware_rentals/', self.rental(hardware), format='json')
+        self.assertEqual(response.status_code, 409)
+
+    def test_returning_frees_the_hardware(self, schedule):
+        rental = self.client.post('/api/hardware_rentals/', self.rental(self.hardware), format='json').data
+        response = self.client.patch(f'/api/hardware_rentals/{rental["id"]}/',
+                                     {'returned_date': timezone.now().isoformat()}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Hardware.objects.get(pk=self.hardware.pk).status, Hardware.AVAILABLE)
+        again = self.client.post('/api/hardware_rentals/', self.rental(self.hardware), format='json')
+        self.assertEqual(again.status_code, 202)
+
+    def test_moving_a_rental_onto_rented_hardware_conflicts(self, schedule):
+        other = make_hardware('Arduino')
+        self.client.post('/api/hardware_rentals/', self.rental(self.hardware), format='json')
+        moved = self.client.post('/api/hardware_rentals/', self.rental(other), format='json').data
+        response = self.client.put(f'/api/hardware_rentals/{moved["id"]}/', self.rental(self.hardware), format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(HardwareRental.objects.get(pk=moved['id']).hardware_id, other.pk)
+
+    def test_moving_a_rental_frees_the_old_hardware(self, schedule):
+        other = make_hardware('Arduino')
+        rental = self.client.post('/api/hardware_rentals/', self.rental(self.hardware), format='json').data
+        response = self.client.put(f'/api/hardware_rentals/{rental["id"]}/', self.rental(other), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Hardware.objects.get(pk=self.hardware.pk).status, Hardware.AVAILABLE)
+        self.assertEqual(Hardware.objects.get(pk=other.pk).status, Hardware.RENTED)
+
+    def test_new_hardware_can_be_reserved(self, schedule):
+        response = self.client.post('/api/hardwares/', {'name': 'Arduino', 'description': 'Uno', 'serial_number': 'SN-2'},
+                                    format='json')
+        self.assertEqual(response.data['status'], Hardware.AVAILABLE)
+        hardware = Hardware.objects.get(pk=response.data['id'])
+        response = self.client.post('/api/hardware_rentals/', self.rental(hardware), format='json')
+        self.assertEqual(response.status_code, 202)
+
+    def test_locked_database_is_retried_later(self, schedule):
+        locked = OperationalError('database is locked')
+        with mock.patch('RESTApi.availability.HardwareRental.objects.create', side_effect=locked), \
+                mock.patch('RESTApi.availability.RESERVE_BACKOFF', 0):
+            response = self.client.post('/api/hardware_rentals/', self.rental(self.hardware), format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(Hardware.objects.get(pk=self.hardware.pk).status, Hardware.AVAILABLE)
+
+
+class InlinePool:
+    # Stands in for the worker pools: runs each job in the calling thread.
+    def submit(self, function, *args):
+        future = Future()
+        try:
+            future.set_result(function(*args))
+        except Exception as error:
+            future.set_exception(error)
+        return future
+
+
+class RentalDocumentTests(TransactionTestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media)
+        self.settings.enable()
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.hardware = make_hardware()
+        pools = mock.patch('RESTApi.rental_documents._get_pools', return_value=(InlinePool(), InlinePool()))
+        pools.start()
+        self.addCleanup(pools.stop)
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media)
+
+    def test_reservation_renders_the_document_after_commit(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/hardware_rentals/', {'user': self.user.pk, 'hardware': self.hardware.pk,
+                                                          'rental_date': timezone.now().isoformat()}, format='json')
+        self.assertEqual(response.status_code, 202)
+        rental = HardwareRental.objects.get(pk=response.data['id'])
+        self.assertEqual(rental.document_status, HardwareRental.DOCUMENT_READY)
+        with rental.file.open('rb') as document:
+            self.assertEqual(document.read(5), b'%PDF-')
+
+    def test_failed_render_marks_the_rental(self):
+        rental = HardwareRental.objects.create(user=self.user, hardware=self.hardware, rental_date=timezone.now())
+        with mock.patch('RESTApi.rental_documents.render_rental_document', side_effect=RuntimeError), \
+                self.assertLogs('RESTApi.rental_documents', 'ERROR'):
+            rental_documents._run(rental.pk)
+        rental.refresh_from_db()
+        self.assertEqual(rental.document_status, HardwareRental.DOCUMENT_FAILED)
+        self.assertFalse(rental.file)
+
+
+class RentalDocumentTemplateTests(SimpleTestCase):
+    data = {'rental_date': '2026-10-18', 'return_date': '2026-11-18', 'first_name': 'Jan', 'last_name': 'Łukasik',
+            'index_number': '123456', 'hardware_name': 'Raspberry Pi (4)', 'serial_number': 'SN-1'}
+
+    def setUp(self):
+        pdf_rendering.init_worker()
+
+    def test_stamped_document_has_a_consistent_xref_table(self):
+        document = pdf_rendering.RentalDocumentTemplate().render(self.data)
+        startxref = int(re.search(rb'startxref\n(\d+)\n%%EOF\n$', document).group(1))
+        xref = re.match(rb'xref\n0 (\d+)\n((?:\d{10} \d{5} [fn] \n)+)trailer\n', document[startxref:])
+        entries = re.findall(rb'(\d{10}) \d{5} ([fn])', xref.group(2))
+        self.assertEqual(len(entries), int(xref.group(1)))
+        self.assertIn(b'/Size %d ' % len(entries), document[startxref:])
+        for number, (offset, kind) in enumerate(entries[1:], 1):
+            self.assertEqual(kind, b'n')
+            self.assertTrue(document[int(offset):].startswith(b'%d 0 obj' % number), number)
+        number = int(re.search(rb'/FormXob\.fields (\d+) 0 R', document).group(1))
+        form = re.search(rb'\n%d 0 obj\n<<.*?/Length (\d+).*?>>\nstream\n' % number, document, re.S)
+        fields = zlib.decompress(document[form.end():form.end() + int(form.group(1))])
+        self.assertTrue(fields.startswith(b'BT') and fields.endswith(b'ET'))
+
+    def test_failure_while_stamping_falls_back_to_a_full_render(self):
+        template = mock.Mock(**{'render.side_effect': struct.error})
+        with mock.patch.object(pdf_rendering, '_template', template), \
+                mock.patch.object(pdf_rendering, 'render_full_document', return_value=b'full') as full, \
+                self.assertLogs('RESTApi.pdf_rendering', 'ERROR'):
+            self.assertEqual(pdf_rendering.render_rental_document(self.data), b'full')
+        full.assert_called_once_with(self.data)
+
+    def test_failure_while_preparing_the_template_falls_back_to_full_renders(self):
+        with mock.patch.object(pdf_rendering, '_initialized', False), mock.patch.object(pdf_rendering, '_template'), \
+                mock.patch.object(pdf_rendering, 'RentalDocumentTemplate', side_effect=AttributeError), \
+                self.assertLogs('RESTApi.pdf_rendering', 'ERROR'):
+            document = pdf_rendering.render_rental_document(self.data)
+            self.assertIsNone(pdf_rendering._template)
+        self.assertTrue(document.startswith(b'%PDF-'))
+
+
+class RentalExportTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media)
+        self.settings.enable()
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media)
+
+    def rental(self, name, **fields):
+        return HardwareRental.objects.create(user=self.user, hardware=make_hardware(name),
+                                             rental_date=timezone.now(), **fields)
+
+    def test_archive_holds_stored_and_rendered_documents_without_saving(self):
+        stored = self.rental('Arduino')
+        rental_documents.save_document(stored, b'%PDF-stored')
+        missing = self.rental('Raspberry Pi')
+        response = self.client.get('/api/hardware_rentals/export/')
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        documents = {name.split('_')[1]: archive.read(name) for name in archive.namelist()}
+        self.assertEqual(documents[str(stored.pk)], b'%PDF-stored')
+        self.assertTrue(documents[str(missing.pk)].startswith(b'%PDF-'))
+        missing.refresh_from_db()
+        self.assertFalse(missing.file)
+        self.assertEqual(missing.document_status, HardwareRental.DOCUMENT_PENDING)
+
+    def test_filters_are_validated(self):
+        response = self.client.get('/api/hardware_rentals/export/', {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+class StaticServingTests(SimpleTestCase):
+    script = b'console.log("kolo");\n' * 200
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        os.makedirs(os.path.join(self.root, 'js'))
+        for name in ('app.0123abcd.js', 'vendor.js'):
+            with open(os.path.join(self.root, 'js', name), 'wb') as script:
+                script.write(self.script)
+        with override_settings(STATIC_ROOT=self.root):
+            call_command('compress_static', 'js', stdout=io.StringIO(), stderr=io.StringIO())
+        self.view = StaticFileView.as_view(document_root=self.root)
+
+    def get(self, path, **headers):
+        response = self.view(RequestFactory().get('/static/' + path, **headers), path=path)
+        self.addCleanup(response.close)
+        return response
+
+    def test_precompressed_file_is_sent_to_clients_accepting_it(self):
+        response = self.get('js/app.0123abcd.js', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('javascript', response['Content-Type'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.script)
+
+    def test_identity_for_clients_without_accept_encoding(self):
+        response = self.get('js/app.0123abcd.js')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(b''.join(response.streaming_content), self.script)
+
+    def test_hashed_names_are_immutable_and_others_revalidate(self):
+        self.assertEqual(self.get('js/app.0123abcd.js')['Cache-Control'], 'public, max-age=31536000, immutable')
+        response = self.get('js/vendor.js', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        again = self.get('js/vendor.js', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_paths_outside_the_root_are_not_found(self):
+        with self.assertRaises(Http404):
+            self.get('../secret.txt')
+
+
+class PreferenceSnapshotTests(TransactionTestCase):
+    def setUp(self):
+        preferences._snapshot.clear()
+
+    def test_repeated_reads_are_served_from_memory(self):
+        preferences.get_preferences()
+        with self.assertNumQueries(0):
+            self.assertEqual(preferences.get_preference('general__default_items_on_page'), 5)
+
+    def test_saved_preference_is_read_back(self):
+        preferences.get_preferences()
+        global_preferences_registry.manager()['general__title'] = 'Koło KOD'
+        self.assertEqual(preferences.get_preference('general__title'), 'Koło KOD')
+
+    @override_settings(VERSION_CHECK_INTERVAL=0)
+    def test_version_bump_from_another_worker_reloads_the_snapshot(self):
+        first = preferences.get_preferences()
+        self.assertIs(preferences.get_preferences(), first)
+        bump_versions(['preferences'])
+        self.assertIsNot(preferences.get_preferences(), first)
+
+
+class IndexPageTests(TransactionTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.write('<title>{{ site_title }}</title>')
+        settings = override_settings(STATIC_ROOT=self.root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        index_page._page.clear()
+
+    def write(self, template):
+        with open(os.path.join(self.root, 'index.html'), 'w', encoding='utf-8') as index:
+            index.write(template)
+
+    def test_repeated_hits_are_served_from_memory(self):
+        first = self.client.get('/')
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/').content, first.content)
+        self.assertEqual(self.client.get('/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+    def test_preference_change_renders_the_page_again(self):
+        self.client.get('/')
+        global_preferences_registry.manager()['general__title'] = 'Koło KOD'
+        self.assertIn('<title>Koło KOD</title>', self.client.get('/').content.decode())
+
+    def test_new_build_renders_the_page_again(self):
+        self.client.get('/')
+        self.write('<h1>{{ site_title }}</h1>')
+        self.assertTrue(self.client.get('/').content.startswith(b'<h1>'))
+
+
+class ConditionalGetTests(TransactionTestCase):
+    # on_commit hooks bump the versions, so these need real commits.
+    def setUp(self):
+        Tag.objects.create(name='python')
+
+    def test_unchanged_resource_answers_304(self):
+        response = self.client.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+        cached = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_write_invalidates_etag_and_cached_response(self):
+        response = self.client.get('/api/tags/')
+        self.assertEqual(self.client.get('/api/tags/')['X-Cache'], 'HIT')
+        Tag.objects.create(name='django')
+        fresh = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(fresh['X-Cache'], 'MISS')
+        self.assertEqual(len(fresh.json()), 2)
+        self.assertNotEqual(fresh['ETag'], response['ETag'])
+
+    def test_login_does_not_invalidate(self):
+        User.objects.create_user('member', password='password')
+        before = {resource: get_version(resource) for resource in ('articles', 'projects', 'profiles')}
+        self.assertTrue(self.client.login(username='member', password='password'))
+        self.assertEqual({resource: get_version(resource) for resource in before}, before)
+
+    def test_commands_writing_with_update_invalidate(self):
+        before = get_version('articles')
+        call_command('recount_comments', stdout=io.StringIO())
+        self.assertGreater(get_version('articles'), before)
+
+    @override_settings(CACHES=LOCAL_CACHE)
+    def test_local_cache_disables_validators(self):
+        response = self.client.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('X-Cache', response)
+
+
+class ResponseCacheTests(TestCase):
+    # Runs on the configured database cache; the versions exist before the test writes anything.
+    def setUp(self):
+        Tag.objects.create(name='python')
+
+    def test_unread_query_parameters_share_the_entry(self):
+        self.assertEqual(self.client.get('/api/tags/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/tags/', {'utm_source': 'newsletter'})['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get('/api/tags/', {'fields': 'id'})['X-Cache'], 'MISS')
+
+    def test_view_specific_parameters_are_part_of_the_key(self):
+        self.client.get('/api/articles/')
+        self.assertEqual(self.client.get('/api/articles/', {'tag': 1})['X-Cache'], 'MISS')
+        self.client.get('/api/search/', {'q': 'python'})
+        self.assertEqual(self.client.get('/api/search/', {'q': 'django'})['X-Cache'], 'MISS')
+
+    def test_hit_reads_the_cache_without_writing_to_it(self):
+        self.client.get('/api/tags/')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/tags/')['X-Cache'], 'HIT')
+        self.assertEqual([query['sql'].split()[0] for query in queries], ['SELECT', 'SELECT'])
+
+    def test_stats_count_hits_and_misses_in_process(self):
+        before = response_cache.get_stats()['resources']['tags']
+        self.client.get('/api/tags/')
+        self.client.get('/api/tags/')
+        after = response_cache.get_stats()['resources']['tags']
+        self.assertEqual((after['hits'] - before['hits'], after['misses'] - before['misses']), (1, 1))
+
+    def test_culling_responses_keeps_the_versions(self):
+        caches = dict(settings.CACHES, default=dict(settings.CACHES['default'],
+                                                    OPTIONS={'MAX_ENTRIES': 2, 'CULL_FREQUENCY': 2}))
+        with override_settings(CACHES=caches):
+            version = get_version('tags')
+            for index in range(5):
+                self.client.get('/api/tags/', {'limit': index})
+            self.assertEqual(get_version('tags'), version)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class SearchTests(TestCase):
+    def test_snippets_are_escaped(self):
+        make_article(User.objects.create_user('author'), text='Say <script>alert(1)</script> hello')
+        result = self.client.get('/api/search/', {'q': 'hello'}).data['results'][0]
+        self.assertNotIn('<script>', result['snippet'])
+        self.assertIn('&lt;script&gt;', result['snippet'])
+        self.assertIn('<mark>hello</mark>', result['snippet'])
+
+
+@mock.patch('RESTApi.image_processing.schedule_image_processing')
+class GalleryThumbnailTests(TransactionTestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media)
+
+    def ready(self, gallery):
+        Gallery.objects.filter(pk=gallery.pk).update(thumbnails_ready=True)
+        return Gallery.objects.get(pk=gallery.pk)
+
+    def test_new_image_is_queued_and_served_full_size(self, schedule):
+        gallery = Gallery.objects.create(gallery_name='gallery', image=png())
+        schedule.assert_called_once_with(gallery)
+        self.assertFalse(Gallery.objects.get(pk=gallery.pk).thumbnails_ready)
+
+    def test_reuploading_identical_bytes_keeps_the_thumbnails(self, schedule):
+        gallery = self.ready(Gallery.objects.create(gallery_name='gallery', image=png('red')))
+        schedule.reset_mock()
+        gallery.image = png('red')
+        gallery.save()
+        schedule.assert_not_called()
+        self.assertTrue(Gallery.objects.get(pk=gallery.pk).thumbnails_ready)
+
+    def test_new_image_resets_the_thumbnails(self, schedule):
+        gallery = self.ready(Gallery.objects.create(gallery_name='gallery', image=png('red')))
+        schedule.reset_mock()
+        gallery.image = png('blue')
+        gallery.save()
+        schedule.assert_called_once_with(gallery)
+        self.assertFalse(Gallery.objects.get(pk=gallery.pk).thumbnails_ready)
+
+    def test_save_reads_the_stored_image_once(self, schedule):
+        gallery = Gallery.objects.create(gallery_name='gallery', image=png())
+        gallery.gallery_name = 'renamed'
+        with CaptureQueriesContext(connection) as queries:
+            gallery.save()
+        lookups = [query for query in queries if query['sql'].startswith('SELECT') and 'RESTApi_gallery' in query['sql']]
+        self.assertEqual(len(lookups), 1)
+        schedule.assert_called_once_with(gallery)
+
+    @mock.patch('RESTApi.image_processing.get_thumbnail')
+    def test_worker_marks_the_thumbnails_ready(self, get_thumbnail, schedule):
+        gallery = Gallery.objects.create(gallery_name='gallery', image=png())
+        with mock.patch('RESTApi.image_processing.generate_variants'):
+            image_processing._run(Gallery, gallery.pk)
+        self.assertEqual(get_thumbnail.call_count, len(settings.GALLERY_THUMBNAILS))
+        self.assertTrue(Gallery.objects.get(pk=gallery.pk).thumbnails_ready)
+
+
+@mock.patch('RESTApi.image_processing.schedule_image_processing')
+@override_settings(IMAGE_VARIANT_WIDTHS=(2, 8), IMAGE_VARIANT_FORMATS=('webp',))
+class ImageVariantTests(TransactionTestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media)
+
+    def test_variants_are_generated_up_to_the_source_width(self, schedule):
+        sponsor = Sponsor.objects.create(name='sponsor', logo=png())
+        image_processing.generate_variants(sponsor)
+        variants = list(sponsor.variants.values_list('format', 'width', 'height'))
+        self.assertEqual(variants, [('webp', 2, 2), ('webp', 4, 4)])
+
+    def test_failed_write_releases_the_variant_files(self, schedule):
+        sponsor = Sponsor.objects.create(name='sponsor', logo=png())
+        blobs = set(Blob.objects.values_list('name', flat=True))
+        with mock.patch('RESTApi.image_processing.ImageVariant.save', side_effect=OperationalError), \
+                self.assertRaises(OperationalError):
+            image_processing.generate_variants(sponsor)
+        self.assertEqual(set(Blob.objects.values_list('name', flat=True)), blobs)
+        self.assertEqual(os.listdir(os.path.join(self.media, 'blobs', 'tmp')), [])
+        self.assertEqual(sum(len(files) for _, _, files in os.walk(self.media)), 1)
+
+    def test_failed_thumbnails_do_not_stop_the_variants(self, schedule):
+        gallery = Gallery.objects.create(gallery_name='gallery', image=png())
+        with mock.patch('RESTApi.image_processing.generate_thumbnails', side_effect=OSError), \
+                self.assertLogs('RESTApi.image_processing', 'ERROR'):
+            image_processing._run(Gallery, gallery.pk)
+        self.assertEqual(gallery.variants.count(), 2)
+
+
+class ChunkedUploadTests(TransactionTestCase):
+    content = b'%PDF-' + bytes(range(256)) * 8
+
+    def setUp(self):
+        self.media, self.staging = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media, UPLOAD_SESSION_ROOT=self.staging)
+        self.settings.enable()
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.rental = HardwareRental.objects.create(user=self.user, hardware=make_hardware(), rental_date=timezone.now())
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media)
+        shutil.rmtree(self.staging)
+
+    def start(self, sha256=None):
+        response = self.client.post('/api/uploads/', {
+            'target': 'hardware_rental', 'filename': 'glejt.pdf', 'size': len(self.content),
+            'sha256': sha256 or hashlib.sha256(self.content).hexdigest()}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response['Location']
+
+    def send(self, url, first, last, **headers):
+        return self.client.put(url, self.content[first:last + 1], content_type='application/octet-stream',
+                               HTTP_CONTENT_RANGE=f'bytes {first}-{last}/{len(self.content)}', **headers)
+
+    def test_upload_in_chunks_and_attach(self):
+        url = self.start()
+        middle = len(self.content) // 2
+        self.assertEqual(self.send(url, 0, middle - 1)['Upload-Offset'], str(middle))
+        self.assertEqual(self.client.get(url).data['offset'], middle)
+        self.send(url, middle, len(self.content) - 1)
+        response = self.client.post(url + 'complete/', {'rental': self.rental.pk}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.rental.refresh_from_db()
+        with self.rental.file.open('rb') as document:
+            self.assertEqual(document.read(), self.content)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(os.listdir(self.staging), [])
+
+    def test_chunk_past_the_offset_conflicts(self):
+        url = self.start()
+        response = self.send(url, 10, 19)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '0')
+
+    def test_corrupt_chunk_is_rejected(self):
+        url = self.start()
+        response = self.send(url, 0, 9, HTTP_X_CHUNK_SHA256='0' * 64)
+        self.assertEqual(response.status_code, 400)
+
+    def test_mismatching_upload_restarts(self):
+        url = self.start(sha256='0' * 64)
+        self.send(url, 0, len(self.content) - 1)
+        response = self.client.post(url + 'complete/', {'rental': self.rental.pk}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(url).data['offset'], 0)
+        self.assertFalse(HardwareRental.objects.get(pk=self.rental.pk).file)
+
+
+@mock.patch('RESTApi.image_processing.schedule_image_processing')
+class BlobStorageTests(TransactionTestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media, CACHES=LOCAL_CACHE)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media)
+
+    def references(self):
+        return dict(Blob.objects.values_list('name', 'references'))
+
+    def test_identical_uploads_share_a_blob(self, schedule):
+        first = Sponsor.objects.create(name='first', logo=png())
+        second = Sponsor.objects.create(name='second', logo=png())
+        self.assertEqual(first.logo.name, second.logo.name)
+        self.assertEqual(self.references(), {first.logo.name: 2})
+        first.delete()
+        self.assertEqual(self.references(), {second.logo.name: 1})
+        self.assertTrue(second.logo.storage.exists(second.logo.name))
+
+    def test_replacing_an_upload_releases_the_old_blob(self, schedule):
+        sponsor = Sponsor.objects.create(name='sponsor', logo=png('red'))
+        old = sponsor.logo.name
+        sponsor.logo = png('blue')
+        sponsor.save()
+        self.assertEqual(self.references(), {sponsor.logo.name: 1})
+        self.assertFalse(sponsor.logo.storage.exists(old))
+
+    def test_regenerating_a_shared_document_keeps_the_other_rental_file(self, schedule):
+        user = User.objects.create_user('member')
+        first, second = [HardwareRental.objects.create(user=user, hardware=make_hardware(name), rental_date=timezone.now())
+                         for name in ('Arduino', 'Raspberry Pi')]
+        rental_documents.save_document(first, b'%PDF-same')
+        rental_documents.save_document(second, b'%PDF-same')
+        shared = first.file.name
+        self.assertEqual(self.references(), {shared: 2})
+        rental_documents.save_document(first, b'%PDF-regenerated')
+        self.assertEqual(self.references(), {shared: 1, first.file.name: 1})
+        with HardwareRental.objects.get(pk=second.pk).file.open('rb') as document:
+            self.assertEqual(document.read(), b'%PDF-same')
+
+    def test_missing_blob_is_404_even_when_conditional(self, schedule):
+        response = self.client.get('/media/blobs/00/00/0000.png', HTTP_IF_NONE_MATCH='"0000"')
+        self.assertEqual(response.status_code, 404)
+        sponsor = Sponsor.objects.create(name='sponsor', logo=png())
+        url = '/media/' + sponsor.logo.name
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import re
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import UploadSession
+
+CHUNK_SIZE = 64 * 1024
+
+_content_range = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+
+class UploadConflict(Exception):
+    # The chunk does not start where the session left off; the client should resume from `offset`.
+    def __init__(self, offset):
+        super().__init__(offset)
+        self.offset = offset
+
+
+class StagedUpload(File):
+    # Exposes the staged file by path, so image validation and storage read it from disk
+    # instead of pulling it into memory.
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def staging_path(session):
+    return os.path.join(settings.UPLOAD_SESSION_ROOT, session.pk.hex)
+
+
+def parse_content_range(value, session):
+    match = _content_range.match(value or '')
+    if match is None:
+        raise ValidationError({'Content-Range': 'Expected "bytes <first>-<last>/<size>"'})
+    first, last, total = match.groups()
+    first, last = int(first), int(last)
+    if last < first or total not in ('*', str(session.size)) or last >= session.size:
+        raise ValidationError({'Content-Range': 'Range does not fit an upload of %d bytes' % session.size})
+    return first, last - first + 1
+
+
+def write_chunk(session, first, length, stream, checksum=None):
+    if first != session.offset:
+        raise UploadConflict(session.offset)
+    path = staging_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    digest = hashlib.sha256()
+    remaining = length
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as output:
+        # Anything past the offset is left over from a chunk that never completed.
+        output.seek(first)
+        output.truncate()
+        while remaining:
+            data = stream.read(min(CHUNK_SIZE, remaining))
+            if not data:
+                break
+            output.write(data)
+            digest.update(data)
+            remaining -= len(data)
+    if remaining:
+        raise ValidationError({'Content-Range': 'Received %d of %d bytes' % (length - remaining, length)})
+    if checksum and checksum.lower() != digest.hexdigest():
+        raise ValidationError({'checksum': 'Chunk does not match its SHA-256'})
+    offset = first + length
+    if not UploadSession.objects.filter(pk=session.pk, offset=first).update(offset=offset, updated=timezone.now()):
+        raise UploadConflict(UploadSession.objects.get(pk=session.pk).offset)
+    session.offset = offset
+    return offset
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def completed_upload(session):
+    # Yields the verified upload as a file; the session is closed once the block succeeds.
+    if session.offset != session.size:
+        raise ValidationError({'offset': 'Upload is incomplete: %d of %d bytes' % (session.offset, session.size)})
+    path = staging_path(session)
+    if _file_digest(path) != session.sha256:
+        UploadSession.objects.filter(pk=session.pk).update(offset=0, updated=timezone.now())
+        session.offset = 0
+        raise ValidationError({'sha256': 'Upload does not match its SHA-256, upload it again'})
+    with open(path, 'rb') as source:
+        yield StagedUpload(source, name=session.filename)
+    session.delete()
+
+
+def expired_sessions():
+    return UploadSession.objects.filter(updated__lt=timezone.now() - settings.UPLOAD_SESSION_MAX_AGE)
+
+
+@receiver(post_delete, sender=UploadSession)
+def delete_staged_file(sender, instance, **kwargs):
+    path = staging_path(instance)
+
+    def remove():
+        if os.path.exists(path):
+            os.remove(path)
+    transaction.on_commit(remove)
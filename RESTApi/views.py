@@ -1,28 +1,46 @@
-import io
-from io import BytesIO
-import datetime
+import os
+
 import django_filters
 from django.contrib.auth.models import User, Group
-from django.http import Http404, HttpResponse, FileResponse
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404, HttpResponse, FileResponse, StreamingHttpResponse
+from django.conf import settings
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
 from django.views import View
-from django.core.files import File as FFile
-from django.views.generic import TemplateView
+from django.views.static import serve
+from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
 from django.http import Http404
-from reportlab.lib.utils import ImageReader
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 
 from rest_framework import viewsets, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import *
 
 from .models import *
+from RESTApi.availability import RESERVE_RETRY_AFTER, HardwareBusy, HardwareUnavailable, available_hardware, reserve, \
+    save_rental
+from RESTApi.bootstrap import build_payload
+from RESTApi.bulk import bulk_create, bulk_update
+from RESTApi.comment_tree import build_comment_tree, load_thread, tree_context
+from RESTApi.conditional import ConditionalGetMixin
 from RESTApi.custom_permissions import *
+from RESTApi.fieldsets import get_fieldset
+from RESTApi.index_page import serve_index
+from RESTApi.multi_get import get_ids, multi_get_response
+from RESTApi.pagination import CommentCursorPagination, PreferencePagination, SearchPagination, get_paginator
+from RESTApi.query_plans import eager_load
+from RESTApi.rental_documents import attach_document, schedule_document
+from RESTApi.rental_export import filter_rentals, stream_archive
+from RESTApi.response_cache import CACHE_QUERY_PARAMS, AnonymousResponseCacheMixin, get_stats
+from RESTApi.search import SEARCH_KINDS, search
+from RESTApi.static_serving import serve_file
 from RESTApi.serializers import *
+from RESTApi.storage import BLOB_PREFIX, blob_digest
+from RESTApi.uploads import UploadConflict, completed_upload, parse_content_range, write_chunk
 from rest_framework import permissions
 
 from allauth.socialaccount.providers.github.views import GitHubOAuth2Adapter
@@ -42,24 +60,51 @@ class GitHubConnect(SocialConnectView):
     client_class = OAuth2Client
 
 
-class IndexTemplateView(TemplateView):
-    template_name = 'index.html'
+class IndexTemplateView(View):
+    # The SPA shell from the frontend build, rendered once and served from memory.
+    def get(self, request):
+        return serve_index(request)
+
+
+class StaticFileView(View):
+    document_root = None
+
+    def get(self, request, path):
+        return serve_file(request, path, self.document_root)
+
+
+class BlobView(View):
+    # Blob content never changes under its name, so clients may keep it forever.
+    cache_control = 'public, max-age=31536000, immutable'
+
+    def get(self, request, path):
+        if not os.path.isfile(safe_join(settings.MEDIA_ROOT, BLOB_PREFIX + path)):
+            raise Http404
+        etag = '"%s"' % blob_digest(path)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = serve(request, BLOB_PREFIX + path, document_root=settings.MEDIA_ROOT)
+        response['ETag'] = etag
+        response['Cache-Control'] = self.cache_control
+        return response
 
 
-class UserViewSetDetail(APIView):
+class UserViewSetDetail(ConditionalGetMixin, APIView):
+    cache_resource = 'users'
     queryset = User.objects.none()
     permission_classes = [IsOwnerOrAdminForUserViewOrReadOnly]
 
-    def get_object(self, pk):
+    def get_object(self, pk, queryset=User.objects):
         try:
-            return User.objects.get(pk=pk)
+            return queryset.get(pk=pk)
         except User.DoesNotExist:
             raise Http404
 
     def get(self, request, pk=None, format=None):
-        queryset = self.get_object(pk)
+        fieldset = get_fieldset(request)
+        queryset = self.get_object(pk, eager_load(User.objects.all(), UserSerializer, **fieldset))
         self.check_object_permissions(self.request, queryset)
-        serializer = UserSerializer(queryset)
+        serializer = UserSerializer(queryset, **fieldset)
         return Response(serializer.data)
 
     def put(self, request, pk=None, format=None):
@@ -87,13 +132,18 @@ class UserViewSetDetail(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserViewSetList(APIView):
+class UserViewSetList(ConditionalGetMixin, APIView):
+    cache_resource = 'users'
     queryset = User.objects.none()
     permission_classes = [IsAdminOrReadOnly]
 
-    def get(self, format=None):
-        queryset = User.objects.all().order_by('-date_joined')
-        serializer = UserSerializer(queryset, many=True)
+    def get(self, request, format=None):
+        fieldset = get_fieldset(request)
+        queryset = eager_load(User.objects.all().order_by('-date_joined'), UserSerializer, **fieldset)
+        ids = get_ids(request)
+        if ids is not None:
+            return multi_get_response(queryset, ids, UserSerializer, **fieldset)
+        serializer = UserSerializer(queryset, many=True, **fieldset)
         return Response(serializer.data)
 
     def post(self, request, format=None):
@@ -104,19 +154,21 @@ class UserViewSetList(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class GroupViewSetDetail(APIView):
+class GroupViewSetDetail(ConditionalGetMixin, APIView):
+    cache_resource = 'groups'
     queryset = Group.objects.none()
     permission_classes = [IsAdminUser]
 
-    def get_object(self, pk=None):
+    def get_object(self, pk=None, queryset=Group.objects):
         try:
-            return Group.objects.get(pk=pk)
+            return queryset.get(pk=pk)
         except Group.DoesNotExist:
             raise Http404
 
     def get(self, request, pk=None, format=None):
-        queryset = self.get_object(pk)
-        serializer = GroupSerializer(queryset)
+        fieldset = get_fieldset(request)
+        queryset = self.get_object(pk, eager_load(Group.objects.all(), GroupSerializer, **fieldset))
+        serializer = GroupSerializer(queryset, **fieldset)
         return Response(serializer.data)
 
     def put(self, request, pk=None, format=None):
@@ -141,13 +193,18 @@ class GroupViewSetDetail(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class GroupViewSetList(APIView):
+class GroupViewSetList(ConditionalGetMixin, APIView):
+    cache_resource = 'groups'
     permission_classes = [IsAdminUser]
     queryset = Group.objects.none()
 
-    def get(self, format=None):
-        queryset = Group.objects.all()
-        serializer = GroupSerializer(queryset, many=True)
+    def get(self, request, format=None):
+        fieldset = get_fieldset(request)
+        queryset = eager_load(Group.objects.all(), GroupSerializer, **fieldset)
+        ids = get_ids(request)
+        if ids is not None:
+            return multi_get_response(queryset, ids, GroupSerializer, **fieldset)
+        serializer = GroupSerializer(queryset, many=True, **fieldset)
         return Response(serializer.data)
 
     def post(self, request, format=None):
@@ -158,19 +215,21 @@ class GroupViewSetList(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ProfileViewSetDetail(APIView):
+class ProfileViewSetDetail(ConditionalGetMixin, APIView):
+    cache_resource = 'profiles'
     queryset = Profile.objects.none()
     permission_classes = [IsAdminOrReadOnly]
 
-    def get_object(self, pk=None):
+    def get_object(self, pk=None, queryset=Profile.objects):
         try:
-            return Profile.objects.get(pk=pk)
+            return queryset.get(pk=pk)
         except Profile.DoesNotExist:
             raise Http404
 
     def get(self, request, pk=None, format=None):
-        queryset = self.get_object(pk=pk)
-        serializer = ProfileSerializer(queryset)
+        fieldset = get_fieldset(request)
+        queryset = self.get_object(pk, eager_load(Profile.objects.all(), ProfileSerializer, **fieldset))
+        serializer = ProfileSerializer(queryset, **fieldset)
         return Response(serializer.data)
 
     def put(self, request, pk=None, format=None):
@@ -195,19 +254,25 @@ class ProfileViewSetDetail(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ProfileViewSetList(APIView):
+class ProfileViewSetList(ConditionalGetMixin, APIView):
+    cache_resource = 'profiles'
     queryset = Profile.objects.none()
     permission_classes = [IsAdminOrReadOnly]
     pagination_class = LimitOffsetPagination
+    keyset_ordering = ('id',)
 
     def get(self, request, format=None):
-        queryset = Profile.objects.all()
-        paginator = self.pagination_class()
-        result_page = paginator.paginate_queryset(queryset, request)
+        fieldset = get_fieldset(request)
+        queryset = eager_load(Profile.objects.all(), ProfileSerializer, **fieldset)
+        ids = get_ids(request)
+        if ids is not None:
+            return multi_get_response(queryset, ids, ProfileSerializer, **fieldset)
+        paginator = get_paginator(self, request)
+        result_page = paginator.paginate_queryset(queryset, request, view=self)
         if result_page is not None:
-            serializer = ProfileSerializer(result_page, many=True)
+            serializer = ProfileSerializer(result_page, many=True, **fieldset)
             return paginator.get_paginated_response(serializer.data)
-        serializer = ProfileSerializer(queryset, many=True)
+        serializer = ProfileSerializer(queryset, many=True, **fieldset)
         return Response(serializer.data)
 
     def post(self, request, format=None):
@@ -218,19 +283,21 @@ class ProfileViewSetList(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ArticleViewSetDetail(APIView):
+class ArticleViewSetDetail(AnonymousResponseCacheMixin, APIView):
+    cache_resource = 'articles'
     queryset = Article.objects.none()
     permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
 
-    def get_object(self, pk):
+    def get_object(self, pk, queryset=Article.objects):
         try:
-            return Article.objects.get(pk=pk)
+            return queryset.get(pk=pk)
         except:
             raise Http404
 
     def get(self, request, pk=None, format=None):
-        queryset = self.get_object(pk)
-        serializer = ArticleSerializer(queryset)
+        fieldset = get_fieldset(request)
+        queryset = self.get_object(pk, eager_load(Article.objects.all(), ArticleSerializer, **fieldset))
+        serializer = ArticleSerializer(queryset, **fieldset)
         return Response(serializer.data)
 
     def put(self, request, pk=None, format=None):
@@ -255,10 +322,13 @@ class ArticleViewSetDetail(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ArticleViewSetList(APIView):
+class ArticleViewSetList(AnonymousResponseCacheMixin, APIView):
+    cache_resource = 'articles'
     queryset = Article.objects.none()
     permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
-    pagination_class = LimitOffsetPagination
+    pagination_class = PreferencePagination
+    keyset_ordering = ('-publication_date', '-id')
+    cache_query_params = CACHE_QUERY_PARAMS + ('tag', 'tagname', 'author', 'authorname')
 
     def get_objects(self):
         tag_id = self.request.query_params.get('tag', None)
@@ -276,24 +346,34 @@ class ArticleViewSetList(APIView):
         return Article.objects.all().order_by('-publication_date')
 
     def get(self, request, format=None):
-        queryset = self.get_objects()
-        paginator = self.pagination_class()
-        result_page = paginator.paginate_queryset(queryset, request)
+        fieldset = get_fieldset(request)
+        queryset = eager_load(self.get_objects(), ArticleSerializer, **fieldset)
+        ids = get_ids(request)
+        if ids is not None:
+            return multi_get_response(queryset, ids, ArticleSerializer, **fieldset)
+        paginator = get_paginator(self, request)
+        result_page = paginator.paginate_queryset(queryset, request, view=self)
         if result_page is not None:
-            serializer = ArticleSerializer(result_page, many=True)
+            serializer = ArticleSerializer(result_page, many=True, **fieldset)
             return paginator.get_paginated_response(serializer.data)
-        serializer = ArticleSerializer(queryset, many=True)
+        serializer = ArticleSerializer(queryset, many=True, **fieldset)
         return Response(serializer.data)
 
     def post(self, request, format=None):
+        if isinstance(request.data, list):
+            return bulk_create(request, ArticleSaveSerializer)
         serializer = ArticleSaveSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def patch(self, request, format=None):
+        return bulk_update(request, Article.objects, ArticleSaveSerializer)
+
 
-class CommentViewSetDetail(APIView):
+class CommentViewSetDetail(ConditionalGetMixin, APIView):
+    cache_resource = 'comments'
     queryset = Comment.objects.none()
     permission_classes = [IsOwnerOrAdminForCommentViewOrReadOnly]
 
@@ -304,8 +384,13 @@ class CommentViewSetDetail(APIView):
             raise Http404
 
     def get(self, request, pk=None, format=None):
+        fieldset = get_fieldset(request)
         queryset = self.get_object(pk)
-        serializer = CommentSerializer(queryset)
+        if queryset.root_article_id is not None:
+            thread = load_thread(queryset.root_article_id, eager_load(Comment.objects.all(), CommentSerializer, **fieldset))
+            build_comment_tree(thread)
+            queryset = next((comment for comment in thread if comment.pk == queryset.pk), queryset)
+        serializer = CommentSerializer(queryset, context=tree_context(request), **fieldset)
         return Response(serializer.data)
 
     def put(self, request, pk=None, format=None):
@@ -333,20 +418,34 @@ class CommentViewSetDetail(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CommentViewSetList(APIView):
+class CommentViewSetList(ConditionalGetMixin, APIView):
+    cache_resource = 'comments'
     queryset = Comment.objects.none()
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = CommentCursorPagination
 
     def get_objects(self):
         article_id = self.request.query_params.get('article', None)
-        if article_id is not None:
-            return Comment.objects.filter(article=article_id).order_by('-creation_date')
-        else: return Comment.objects.all().order_by('-creation_date')
+        parent_id = self.request.query_params.get('parent', None)
+        if parent_id is not None:
+            queryset = Comment.objects.filter(parent=parent_id)
+        elif article_id is not None:
+            queryset = Comment.objects.filter(article=article_id)
+        else:
+            queryset = Comment.objects.filter(parent__isnull=True)
+        return eager_load(queryset, CommentFeedSerializer, **get_fieldset(self.request))
 
     def get(self, request, format=None):
+        ids = get_ids(request)
+        if ids is not None:
+            fieldset = get_fieldset(request)
+            queryset = eager_load(Comment.objects.all(), CommentFeedSerializer, **fieldset)
+            return multi_get_response(queryset, ids, CommentFeedSerializer, **fieldset)
         queryset = self.get_objects()
-        serializer = CommentSerializer(queryset, many="True")
-        return Response(serializer.data)
+        paginator = self.pagination_class()
+        result_page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = CommentFeedSerializer(result_page, many=True, **get_fieldset(request))
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request, format=None):
         serializer = CommentSaveSerializer(data=request.data)
@@ -356,19 +455,65 @@ class CommentViewSetList(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class TagViewSetDetail(APIView):
+class ArticleCommentsView(ConditionalGetMixin, APIView):
+    cache_resource = 'comments'
+    queryset = Comment.objects.none()
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = LimitOffsetPagination
+
+    def get(self, request, pk=None, format=None):
+        try:
+            article = eager_load(Article.objects.all(), ArticleSerializer).get(pk=pk)
+        except Article.DoesNotExist:
+            raise Http404
+        fieldset = get_fieldset(request)
+        roots = build_comment_tree(load_thread(article.pk, eager_load(Comment.objects.all(), CommentSerializer, **fieldset)))
+        paginator = self.pagination_class()
+        result_page = paginator.paginate_queryset(roots, request)
+        if result_page is not None:
+            serializer = CommentSerializer(result_page, many=True, context=tree_context(request), **fieldset)
+            response = paginator.get_paginated_response(serializer.data)
+        else:
+            serializer = CommentSerializer(roots, many=True, context=tree_context(request), **fieldset)
+            response = Response({'results': serializer.data})
+        response.data['article'] = ArticleSerializer(article).data
+        return response
+
+    def post(self, request, pk=None, format=None):
+        if not Article.objects.filter(pk=pk).exists():
+            raise Http404
+        data = request.data.copy()
+        # Top-level comments hang off the article, replies off a parent from the same thread.
+        if data.get('parent'):
+            data.pop('article', None)
+            if not Comment.objects.filter(pk=data['parent'], root_article=pk).exists():
+                return Response({'parent': ["Comment is not part of this article's thread"]},
+                                status=status.HTTP_400_BAD_REQUEST)
+        else:
+            data.pop('parent', None)
+            data['article'] = pk
+        serializer = CommentSaveSerializer(data=data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class TagViewSetDetail(AnonymousResponseCacheMixin, APIView):
+    cache_resource = 'tags'
     queryset = Tag.objects.none()
     permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
 
-    def get_object(self, pk):
+    def get_object(self, pk, queryset=Tag.objects):
         try:
-            return Tag.objects.get(pk=pk)
+            return queryset.get(pk=pk)
         except Tag.DoesNotExist:
             raise Http404
 
     def get(self, request, pk=None, format=None):
-        queryset = self.get_object(pk)
-        serializer = TagSerializer(queryset)
+        fieldset = get_fieldset(request)
+        queryset = self.get_object(pk, eager_load(Tag.objects.all(), TagSerializer, **fieldset))
+        serializer = TagSerializer(queryset, **fieldset)
         return Response(serializer.data)
 
     def put(self, request, pk=None, format=None):
@@ -393,36 +538,48 @@ class TagViewSetDetail(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class TagViewSetList(APIView):
+class TagViewSetList(AnonymousResponseCacheMixin, APIView):
+    cache_resource = 'tags'
     queryset = Tag.objects.none()
     permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
 
-    def get(self, format=None):
-        queryset = Tag.objects.all()
-        serializer = TagSerializer(queryset, many=True)
+    def get(self, request, format=None):
+        fieldset = get_fieldset(request)
+        queryset = eager_load(Tag.objects.all(), TagSerializer, **fieldset)
+        ids = get_ids(request)
+        if ids is not None:
+            return multi_get_response(queryset, ids, TagSerializer, **fieldset)
+        serializer = TagSerializer(queryset, many=True, **fieldset)
         return Response(serializer.data)
 
     def post(self, request, format=None):
+        if isinstance(request.data, list):
+            return bulk_create(request, TagSerializer)
         serializer = TagSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def patch(self, request, format=None):
+        return bulk_update(request, Tag.objects, TagSerializer)
 
-class FileViewSetDetail(APIView):
+
+class FileViewSetDetail(ConditionalGetMixin, APIView):
+    cache_resource = 'files'
     queryset = File.objects.none()
     permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
 
-    def get_object(self, pk):
+    def get_object(self, pk, queryset=File.objects):
         try:
-            return File.objects.get(pk=pk)
+            return queryset.get(pk=pk)
         except File.DoesNotExist:
             raise Http404
 
     def get(self, request, pk=None, format=None):
-        queryset = self.get_object(pk)
-        serializer = FileSerializer(queryset)
+        fieldset = get_fieldset(request)
+        queryset = self.get_object(pk, eager_load(File.objects.all(), FileSerializer, **fieldset))
+        serializer = FileSerializer(queryset, **fieldset)
         return Response(serializer.data)
 
     def put(self, request, pk=None, format=None):
@@ -447,13 +604,18 @@ class FileViewSetDetail(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class FileViewSetList(APIView):
+class FileViewSetList(ConditionalGetMixin, APIView):
+    cache_resource = 'files'
     queryset = File.objects.none()
     permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
     
-    def get(self, format=None):
-        queryset = File.objects.all()
-        serializer = FileSerializer(queryset, many=True)
+    def get(self, request, format=None):
+        fieldset = get_fieldset(request)
+        queryset = eager_load(File.objects.all(), FileSerializer, **fieldset)
+        ids = get_ids(request)
+        if ids is not None:
+            return multi_get_response(queryset, ids, FileSerializer, **fieldset)
+        serializer = FileSerializer(queryset, many=True, **fieldset)
         return Response(serializer.data)
 
     def post(self, request, format=None):
@@ -475,26 +637,40 @@ class HardwareRentalSet(viewsets.ModelViewSet):
         return self.serializer_class
 
 
-class HardwareRentalViewSetDetail(APIView):
+def hardware_busy():
+    response = Response({'hardware': ['This hardware is being booked, try again']},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = str(RESERVE_RETRY_AFTER)
+    return response
+
+
+class HardwareRentalViewSetDetail(ConditionalGetMixin, APIView):
+    cache_resource = 'hardware_rentals'
     queryset = HardwareRental.objects.none()
     permission_classes = (permissions.DjangoModelPermissions,)
 
-    def get_object(self, pk=None):
+    def get_object(self, pk=None, queryset=HardwareRental.objects):
         try:
-            return HardwareRental.objects.get(pk=pk)
+            return queryset.get(pk=pk)
         except HardwareRental.DoesNotExist:
             raise Http404
 
     def get(self, request, pk=None, format=None):
-        queryset = self.get_object(pk=pk)
-        serializer = HardwareRentalSerializer(queryset)
+        fieldset = get_fieldset(request)
+        queryset = self.get_object(pk, eager_load(HardwareRental.objects.all(), HardwareRentalSerializer, **fieldset))
+        serializer = HardwareRentalSerializer(queryset, **fieldset)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def put(self, request, pk=None, format=None):
         queryset = self.get_object(pk)
         serializer = HardwareRentalSaveSerializer(queryset, data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            try:
+                save_rental(serializer)
+            except HardwareUnavailable:
+                return Response({'hardware': ['This hardware is not available']}, status=status.HTTP_409_CONFLICT)
+            except HardwareBusy:
+                return hardware_busy()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -507,35 +683,60 @@ class HardwareRentalViewSetDetail(APIView):
         queryset = self.get_object(pk)
         serializer = HardwareRentalSerializer(queryset, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            try:
+                save_rental(serializer)
+            except HardwareUnavailable:
+                return Response({'hardware': ['This hardware is not available']}, status=status.HTTP_409_CONFLICT)
+            except HardwareBusy:
+                return hardware_busy()
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class HardwareRentalViewSetList(APIView):
+class HardwareRentalViewSetList(ConditionalGetMixin, APIView):
+    cache_resource = 'hardware_rentals'
     queryset = HardwareRental.objects.none()
     permission_classes = (permissions.DjangoModelPermissions,)
 
-    def get(self, format=None):
-        queryset = HardwareRental.objects.all()
-        serializer = HardwareRentalSerializer(queryset, many=True)
+    def get(self, request, format=None):
+        fieldset = get_fieldset(request)
+        queryset = eager_load(HardwareRental.objects.all(), HardwareRentalSerializer, **fieldset)
+        ids = get_ids(request)
+        if ids is not None:
+            return multi_get_response(queryset, ids, HardwareRentalSerializer, **fieldset)
+        serializer = HardwareRentalSerializer(queryset, many=True, **fieldset)
         return Response(serializer.data)
 
     def post(self, request, format=None):
         serializer = HardwareRentalSaveSerializer(data=request.data)
         if serializer.is_valid():
-            if serializer.validated_data["hardware"].rentals.filter(return_date__isnull=False).exists():
-                return Response(serializer.data, status=status.HTTP_400_BAD_REQUEST)
-            serializer.save()
-            pdf = generate_pdf(serializer.validated_data)
-            with open('glejt.pdf', 'wb+') as glejt:
-                glejt.write(pdf.getbuffer())
-                file = FFile(glejt)
-                serializer.save().file.save(f'glejt{datetime.datetime}.pdf', file)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            try:
+                rental = serializer.instance = reserve(**serializer.validated_data)
+            except HardwareUnavailable:
+                return Response({'hardware': ['This hardware is not available']}, status=status.HTTP_409_CONFLICT)
+            except HardwareBusy:
+                return hardware_busy()
+            schedule_document(rental)
+            response = Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+            response['Location'] = reverse('hardware_rental_detail', kwargs={'pk': rental.pk})
+            return response
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class HardwareRentalExportView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, format=None):
+        params = request.query_params
+        try:
+            rentals = filter_rentals(params.get('since'), params.get('until'), params.get('user'), params.get('hardware'))
+        except DjangoValidationError as error:
+            raise ValidationError(error.message_dict)
+        response = StreamingHttpResponse(stream_archive(rentals), content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="hardware_rentals.zip"'
+        return response
+
+
 class HardwareSet(viewsets.ModelViewSet):
     permission_classes = (permissions.DjangoModelPermissions,)
     queryset = Hardware.objects.all()
@@ -548,19 +749,21 @@ class HardwareSet(viewsets.ModelViewSet):
         return self.serializer_class
 
 
-class HardwareViewSetDetail(APIView):
+class HardwareViewSetDetail(ConditionalGetMixin, APIView):
+    cache_resource = 'hardwares'
     queryset = Hardware.objects.none()
     permission_classes = (permissions.DjangoModelPermissions,)
 
-    def get_object(self, pk=None):
+    def get_object(self, pk=None, queryset=Hardware.objects):
         try:
-            return Hardware.objects.get(pk=pk)
+            return queryset.get(pk=pk)
         except Profile.DoesNotExist:
             raise Http404
 
     def get(self, request, pk=None, format=None):
-        queryset = self.get_object(pk=pk)
-        serializer = HardwareSerializer(queryset)
+        fieldset = get_fieldset(request)
+        queryset = self.get_object(pk, eager_load(Hardware.objects.all(), HardwareSerializer, **fieldset))
+        serializer = HardwareSerializer(queryset, **fieldset)
         return Response(serializer.data)
 
     def put(self, request, pk=None, format=None):
@@ -585,42 +788,65 @@ class HardwareViewSetDetail(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class HardwareViewSetList(APIView):
+class HardwareViewSetList(ConditionalGetMixin, APIView):
+    cache_resource = 'hardwares'
     queryset = Hardware.objects.none()
     permission_classes = (permissions.DjangoModelPermissions,)
     pagination_class = LimitOffsetPagination
+    keyset_ordering = ('id',)
+
+    def get_objects(self):
+        available = self.request.query_params.get('available', None)
+        if available is None:
+            return Hardware.objects.all()
+        if available.lower() in ('true', '1'):
+            return available_hardware()
+        if available.lower() in ('false', '0'):
+            return Hardware.objects.exclude(status=Hardware.AVAILABLE)
+        raise ValidationError({'available': 'Expected true or false'})
 
     def get(self, request, format=None):
-        queryset = Hardware.objects.all()
-        paginator = self.pagination_class()
-        result_page = paginator.paginate_queryset(queryset, request)
+        fieldset = get_fieldset(request)
+        queryset = eager_load(self.get_objects(), HardwareSerializer, **fieldset)
+        ids = get_ids(request)
+        if ids is not None:
+            return multi_get_response(queryset, ids, HardwareSerializer, **fieldset)
+        paginator = get_paginator(self, request)
+        result_page = paginator.paginate_queryset(queryset, request, view=self)
         if result_page is not None:
-            serializer = HardwareSerializer(result_page, many=True)
+            serializer = HardwareSerializer(result_page, many=True, **fieldset)
             return paginator.get_paginated_response(serializer.data)
-        serializer = HardwareSerializer(queryset, many=True)
+        serializer = HardwareSerializer(queryset, many=True, **fieldset)
         return Response(serializer.data)
 
     def post(self, request, format=None):
+        if isinstance(request.data, list):
+            return bulk_create(request, HardwareSaveSerializer)
         serializer = HardwareSaveSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def patch(self, request, format=None):
+        return bulk_update(request, Hardware.objects, HardwareSaveSerializer)
 
-class ProjectViewSetDetail(APIView):
+
+class ProjectViewSetDetail(AnonymousResponseCacheMixin, APIView):
+    cache_resource = 'projects'
     queryset = Project.objects.none()
     permission_classes = (permissions.DjangoModelPermissionsOrAnonReadOnly,)
 
-    def get_object(self, pk):
+    def get_object(self, pk, queryset=Project.objects):
         try:
-            return Project.objects.get(pk=pk)
+            return queryset.get(pk=pk)
         except:
             raise Http404
 
     def get(self, request, pk=None, format=None):
-        queryset = self.get_object(pk)
-        serializer = ProjectSerializer(queryset)
+        fieldset = get_fieldset(request)
+        queryset = self.get_object(pk, eager_load(Project.objects.all(), ProjectSerializer, **fieldset))
+        serializer = ProjectSerializer(queryset, **fieldset)
         return Response(serializer.data)
 
     def put(self, request, pk=None, format=None):
@@ -645,19 +871,25 @@ class ProjectViewSetDetail(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ProjectViewSetList(APIView):
+class ProjectViewSetList(AnonymousResponseCacheMixin, APIView):
+    cache_resource = 'projects'
     permission_classes = (permissions.DjangoModelPermissionsOrAnonReadOnly,)
     queryset = Project.objects.none()
-    pagination_class = LimitOffsetPagination
+    pagination_class = PreferencePagination
+    keyset_ordering = ('-id',)
 
     def get(self, request, format=None):
-        queryset = Project.objects.all().order_by('-id')
-        paginator = self.pagination_class()
-        result_page = paginator.paginate_queryset(queryset, request)
+        fieldset = get_fieldset(request)
+        queryset = eager_load(Project.objects.all().order_by('-id'), ProjectSerializer, **fieldset)
+        ids = get_ids(request)
+        if ids is not None:
+            return multi_get_response(queryset, ids, ProjectSerializer, **fieldset)
+        paginator = get_paginator(self, request)
+        result_page = paginator.paginate_queryset(queryset, request, view=self)
         if result_page is not None:
-            serializer = ProjectSerializer(result_page, many=True)
+            serializer = ProjectSerializer(result_page, many=True, **fieldset)
             return paginator.get_paginated_response(serializer.data)
-        serializer = ProjectSerializer(queryset, many=True)
+        serializer = ProjectSerializer(queryset, many=True, **fieldset)
         return Response(serializer.data)
 
     def post(self, request, format=None):
@@ -668,19 +900,21 @@ class ProjectViewSetList(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class SectionViewSetDetail(APIView):
+class SectionViewSetDetail(AnonymousResponseCacheMixin, APIView):
+    cache_resource = 'section'
     queryset = Section.objects.none()
     permission_classes = (permissions.DjangoModelPermissionsOrAnonReadOnly,)
 
-    def get_object(self, pk=None):
+    def get_object(self, pk=None, queryset=Section.objects):
         try:
-            return Section.objects.get(pk=pk)
+            return queryset.get(pk=pk)
         except Section.DoesNotExist:
             raise Http404
 
     def get(self, request, pk=None, format=None):
-        queryset = self.get_object(pk=pk)
-        serializer = SectionSerializer(queryset)
+        fieldset = get_fieldset(request)
+        queryset = self.get_object(pk, eager_load(Section.objects.all(), SectionSerializer, **fieldset))
+        serializer = SectionSerializer(queryset, **fieldset)
         return Response(serializer.data)
 
     def put(self, request, pk=None, format=None):
@@ -705,13 +939,18 @@ class SectionViewSetDetail(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class SectionViewSetList(APIView):
+class SectionViewSetList(AnonymousResponseCacheMixin, APIView):
+    cache_resource = 'section'
     queryset = Section.objects.none()
     permission_classes = (permissions.DjangoModelPermissionsOrAnonReadOnly,)
 
-    def get(self, format=None):
-        queryset = Section.objects.all()
-        serializer = SectionSerializer(queryset, many=True)
+    def get(self, request, format=None):
+        fieldset = get_fieldset(request)
+        queryset = eager_load(Section.objects.all(), SectionSerializer, **fieldset)
+        ids = get_ids(request)
+        if ids is not None:
+            return multi_get_response(queryset, ids, SectionSerializer, **fieldset)
+        serializer = SectionSerializer(queryset, many=True, **fieldset)
         return Response(serializer.data)
 
     def post(self, request, format=None):
@@ -722,19 +961,21 @@ class SectionViewSetList(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class GalleryViewSetDetail(APIView):
+class GalleryViewSetDetail(ConditionalGetMixin, APIView):
+    cache_resource = 'gallery'
     queryset = Gallery.objects.none()
     permission_classes = (permissions.DjangoModelPermissionsOrAnonReadOnly,)
 
-    def get_object(self, pk):
+    def get_object(self, pk, queryset=Gallery.objects):
         try:
-            return Gallery.objects.get(pk=pk)
+            return queryset.get(pk=pk)
         except:
             raise Http404
 
     def get(self, request, pk=None, format=None):
-        queryset = self.get_object(pk)
-        serializer = GallerySerializer(queryset)
+        fieldset = get_fieldset(request)
+        queryset = self.get_object(pk, eager_load(Gallery.objects.all(), GallerySerializer, **fieldset))
+        serializer = GallerySerializer(queryset, **fieldset)
         return Response(serializer.data)
 
     def put(self, request, pk=None, format=None):
@@ -759,7 +1000,8 @@ class GalleryViewSetDetail(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class GalleryViewSetList(APIView):
+class GalleryViewSetList(ConditionalGetMixin, APIView):
+    cache_resource = 'gallery'
     queryset = Gallery.objects.none()
     permission_classes = (permissions.DjangoModelPermissionsOrAnonReadOnly,)
 
@@ -770,8 +1012,12 @@ class GalleryViewSetList(APIView):
         return Gallery.objects.filter(article=article_id)
 
     def get(self, request, format=None):
-        queryset = self.get_objects()
-        serializer = GallerySerializer(queryset, many="True")
+        fieldset = get_fieldset(request)
+        queryset = eager_load(self.get_objects(), GallerySerializer, **fieldset)
+        ids = get_ids(request)
+        if ids is not None:
+            return multi_get_response(queryset, ids, GallerySerializer, **fieldset)
+        serializer = GallerySerializer(queryset, many=True, **fieldset)
         return Response(serializer.data)
 
     def post(self, request, format=None):
@@ -782,19 +1028,21 @@ class GalleryViewSetList(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class SponsorViewSetDetail(APIView):
+class SponsorViewSetDetail(AnonymousResponseCacheMixin, APIView):
+    cache_resource = 'sponsors'
     queryset = Sponsor.objects.none()
     permission_classes = (permissions.DjangoModelPermissionsOrAnonReadOnly,)
 
-    def get_object(self, pk):
+    def get_object(self, pk, queryset=Sponsor.objects):
         try:
-            return Sponsor.objects.get(pk=pk)
+            return queryset.get(pk=pk)
         except:
             raise Http404
 
     def get(self, request, pk=None, format=None):
-        queryset = self.get_object(pk)
-        serializer = SponsorSerializer(queryset)
+        fieldset = get_fieldset(request)
+        queryset = self.get_object(pk, eager_load(Sponsor.objects.all(), SponsorSerializer, **fieldset))
+        serializer = SponsorSerializer(queryset, **fieldset)
         return Response(serializer.data)
 
     def put(self, request, pk=None, format=None):
@@ -819,13 +1067,18 @@ class SponsorViewSetDetail(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class SponsorViewSetList(APIView):
+class SponsorViewSetList(AnonymousResponseCacheMixin, APIView):
+    cache_resource = 'sponsors'
     queryset = Sponsor.objects.none()
     permission_classes = (permissions.DjangoModelPermissionsOrAnonReadOnly,)
 
-    def get(self, format=None):
-        queryset = Sponsor.objects.all()
-        serializer = SponsorSerializer(queryset, many=True)
+    def get(self, request, format=None):
+        fieldset = get_fieldset(request)
+        queryset = eager_load(Sponsor.objects.all(), SponsorSerializer, **fieldset)
+        ids = get_ids(request)
+        if ids is not None:
+            return multi_get_response(queryset, ids, SponsorSerializer, **fieldset)
+        serializer = SponsorSerializer(queryset, many=True, **fieldset)
         return Response(serializer.data)
 
     def post(self, request, format=None):
@@ -836,47 +1089,21 @@ class SponsorViewSetList(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-def generate_pdf(data):
-    buffer = io.BytesIO()
-    pdf = canvas.Canvas(buffer)
-    pdfmetrics.registerFont(TTFont('Verdana', 'RESTApi/templates/verdana.ttf'))
-    pdf.setFont('Verdana', 10)
-    pdf.drawImage('RESTApi/templates/logo_color.bmp', 40, 720, width=192, height=103)
-    pdf.drawString(50, 710, 'Studenckie Koło Naukowe Informatyków „KOD”')
-    pdf.drawString(50, 696, 'Politechnika Rzeszowska')
-    pdf.drawString(50, 682, 'Katedra Informatyki i Automatyki')
-    pdf.drawString(400, 710, f'Rzeszów, {data["rental_date"].date()}')
-    pdf.setFont('Verdana', 15)
-    pdf.drawCentredString(300, 600, 'Oświadczenie - rewers')
-    pdf.setFont('Verdana', 10)
-    pdf.drawCentredString(300, 550, 'Ja, niżej podpisany:')
-    pdf.drawCentredString(300, 530, f'{data["user"].first_name} {data["user"].last_name}')
-    pdf.drawCentredString(300, 510, f'członek SKNI „KOD”, o numerze indeksu {data["user"].profile.index_number}')
-    pdf.drawCentredString(300, 490, 'oświadczam, że wypożyczam następujący sprzęt:')
-    pdf.drawCentredString(300, 470, f'{data["hardware"].name} o numerze seryjnym {data["hardware"].serial_number}')
-    pdf.drawCentredString(300, 450,
-                          'którego właścicielem jest Politechnika Rzeszowska, Katedra Informatyki i Automatyki.')
-    pdf.drawCentredString(300, 430, f'W razie zgubienia lub uszkodzenia zobowiązuję się do pokrycia kosztów.')
-    pdf.drawCentredString(300, 410, f'Urządzenie zwrócę najpóźniej do dnia: {data["return_date"].date()}')
-    pdf.showPage()
-    pdf.save()
-    buffer.seek(0)
-    return buffer
-
-
-class GenericLinkViewSetDetail(APIView):
+class GenericLinkViewSetDetail(ConditionalGetMixin, APIView):
+    cache_resource = 'generic_links'
     queryset = GenericLink.objects.none()
     permission_classes = (permissions.DjangoModelPermissionsOrAnonReadOnly,)
 
-    def get_object(self, pk=None):
+    def get_object(self, pk=None, queryset=GenericLink.objects):
         try:
-            return GenericLink.objects.get(pk=pk)
+            return queryset.get(pk=pk)
         except Profile.DoesNotExist:
             raise Http404
 
     def get(self, request, pk=None, format=None):
-        queryset = self.get_object(pk=pk)
-        serializer = GenericLinkBigSerializer(queryset)
+        fieldset = get_fieldset(request)
+        queryset = self.get_object(pk, eager_load(GenericLink.objects.all(), GenericLinkBigSerializer, **fieldset))
+        serializer = GenericLinkBigSerializer(queryset, **fieldset)
         return Response(serializer.data)
 
     def put(self, request, pk=None, format=None):
@@ -901,59 +1128,82 @@ class GenericLinkViewSetDetail(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class GenericLinkViewSetList(APIView):
+class GenericLinkViewSetList(ConditionalGetMixin, APIView):
+    cache_resource = 'generic_links'
     queryset = GenericLink.objects.none()
     permission_classes = (permissions.DjangoModelPermissionsOrAnonReadOnly,)
     pagination_class = LimitOffsetPagination
+    keyset_ordering = ('id',)
 
     def get(self, request, format=None):
-        queryset = GenericLink.objects.all()
-        paginator = self.pagination_class()
-        result_page = paginator.paginate_queryset(queryset, request)
+        fieldset = get_fieldset(request)
+        queryset = eager_load(GenericLink.objects.all(), GenericLinkBigSerializer, **fieldset)
+        ids = get_ids(request)
+        if ids is not None:
+            return multi_get_response(queryset, ids, GenericLinkBigSerializer, **fieldset)
+        paginator = get_paginator(self, request)
+        result_page = paginator.paginate_queryset(queryset, request, view=self)
         if result_page is not None:
-            serializer = GenericLinkBigSerializer(result_page, many=True)
+            serializer = GenericLinkBigSerializer(result_page, many=True, **fieldset)
             return paginator.get_paginated_response(serializer.data)
-        serializer = GenericLinkBigSerializer(queryset, many=True)
+        serializer = GenericLinkBigSerializer(queryset, many=True, **fieldset)
         return Response(serializer.data)
 
     def post(self, request, format=None):
+        if isinstance(request.data, list):
+            return bulk_create(request, GenericLinkBigSaveSerializer)
         serializer = GenericLinkBigSaveSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def patch(self, request, format=None):
+        return bulk_update(request, GenericLink.objects, GenericLinkBigSaveSerializer)
+
 
-class FooterLinkListView(APIView):
+class FooterLinkListView(AnonymousResponseCacheMixin, APIView):
+    cache_resource = 'footer_links'
     queryset = FooterLink.objects.none()
     permission_classes = (permissions.DjangoModelPermissionsOrAnonReadOnly,)
 
     def get(self, request, format=None):
-        queryset = FooterLink.objects.all()
-        serializer = FooterLinkSerializer(queryset, many=True)
+        fieldset = get_fieldset(request)
+        queryset = eager_load(FooterLink.objects.all(), FooterLinkSerializer, **fieldset)
+        ids = get_ids(request)
+        if ids is not None:
+            return multi_get_response(queryset, ids, FooterLinkSerializer, **fieldset)
+        serializer = FooterLinkSerializer(queryset, many=True, **fieldset)
         return Response(serializer.data)
 
     def post(self, request, format=None):
+        if isinstance(request.data, list):
+            return bulk_create(request, FooterLinkSerializer)
         serializer = FooterLinkSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status.HTTP_400_BAD_REQUEST)
 
+    def patch(self, request, format=None):
+        return bulk_update(request, FooterLink.objects, FooterLinkSerializer)
+
 
-class FooterLinkDetailView(APIView):
+class FooterLinkDetailView(AnonymousResponseCacheMixin, APIView):
+    cache_resource = 'footer_links'
     queryset = FooterLink.objects.none()
     permission_classes = (permissions.DjangoModelPermissionsOrAnonReadOnly,)
 
-    def get_object(self, pk=None):
+    def get_object(self, pk=None, queryset=FooterLink.objects):
         try:
-            return FooterLink.objects.get(pk=pk)
+            return queryset.get(pk=pk)
         except Profile.DoesNotExist:
             raise Http404
 
     def get(self, request, pk=None, format=None):
-        queryset = self.get_object(pk=pk)
-        serializer = FooterLinkSerializer(queryset)
+        fieldset = get_fieldset(request)
+        queryset = self.get_object(pk, eager_load(FooterLink.objects.all(), FooterLinkSerializer, **fieldset))
+        serializer = FooterLinkSerializer(queryset, **fieldset)
         return Response(serializer.data)
 
     def put(self, request, pk=None, format=None):
@@ -975,4 +1225,134 @@ class FooterLinkDetailView(APIView):
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ResponseCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, format=None):
+        return Response(get_stats())
+
+
+# Sections, sponsors, footer links, global preferences and the latest articles and projects in a
+# single response, so the first page load is one request and one cache entry.
+class BootstrapView(AnonymousResponseCacheMixin, APIView):
+    cache_resource = 'bootstrap'
+    permission_classes = (AllowAny,)
+
+    def get(self, request, format=None):
+        return Response(build_payload())
+
+
+class SearchView(AnonymousResponseCacheMixin, APIView):
+    cache_resource = 'search'
+    permission_classes = (AllowAny,)
+    pagination_class = SearchPagination
+    cache_query_params = CACHE_QUERY_PARAMS + ('q', 'type')
+
+    def get_kinds(self, request):
+        value = request.query_params.get('type')
+        if not value:
+            return SEARCH_KINDS
+        kinds = tuple(kind for kind in SEARCH_KINDS if kind in value.split(','))
+        if not kinds:
+            raise ValidationError({'type': 'Expected one of: %s' % ', '.join(SEARCH_KINDS)})
+        return kinds
+
+    def get(self, request, format=None):
+        results = search(request.query_params.get('q', ''), self.get_kinds(request))
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(results, request, view=self)
+        return paginator.get_paginated_response(page)
+
+
+# Permission needed to create and finalize a chunked upload into each target.
+UPLOAD_TARGET_PERMISSIONS = {
+    UploadSession.GALLERY: 'RESTApi.add_gallery',
+    UploadSession.HARDWARE_RENTAL: 'RESTApi.change_hardwarerental',
+}
+
+
+class UploadSessionMixin:
+    permission_classes = [IsAuthenticated]
+
+    def check_target(self, request, target):
+        if not request.user.has_perm(UPLOAD_TARGET_PERMISSIONS[target]):
+            self.permission_denied(request)
+
+    def get_object(self, pk):
+        try:
+            return UploadSession.objects.get(pk=pk, user=self.request.user)
+        except (UploadSession.DoesNotExist, DjangoValidationError):
+            raise Http404
+
+    def offset_response(self, data, offset, status=status.HTTP_200_OK):
+        response = Response(data, status=status)
+        response['Upload-Offset'] = offset
+        return response
+
+
+class UploadSessionListView(UploadSessionMixin, APIView):
+    def post(self, request, format=None):
+        serializer = UploadSessionSerializer(data=request.data)
+        if serializer.is_valid():
+            self.check_target(request, serializer.validated_data['target'])
+            session = serializer.save(user=request.user)
+            response = self.offset_response(serializer.data, session.offset, status.HTTP_201_CREATED)
+            response['Location'] = reverse('upload_session_detail', kwargs={'pk': session.pk})
+            return response
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class UploadSessionDetailView(UploadSessionMixin, APIView):
+    def get(self, request, pk=None, format=None):
+        session = self.get_object(pk)
+        return self.offset_response(UploadSessionSerializer(session).data, session.offset)
+
+    def put(self, request, pk=None, format=None):
+        # The body is the raw chunk, described by Content-Range and optionally X-Chunk-SHA256.
+        session = self.get_object(pk)
+        try:
+            first, length = parse_content_range(request.META.get('HTTP_CONTENT_RANGE'), session)
+            write_chunk(session, first, length, request.stream, request.META.get('HTTP_X_CHUNK_SHA256'))
+        except UploadConflict as conflict:
+            return self.offset_response({'offset': conflict.offset}, conflict.offset, status.HTTP_409_CONFLICT)
+        except DjangoValidationError as error:
+            raise ValidationError(error.message_dict)
+        return self.offset_response(UploadSessionSerializer(session).data, session.offset)
+
+    def delete(self, request, pk=None, format=None):
+        self.get_object(pk).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadSessionCompleteView(UploadSessionMixin, APIView):
+    def get_rental(self, request):
+        try:
+            return HardwareRental.objects.get(pk=int(request.data.get('rental')))
+        except (TypeError, ValueError, HardwareRental.DoesNotExist):
+            raise ValidationError({'rental': 'Expected the id of an existing hardware rental'})
+
+    def post(self, request, pk=None, format=None):
+        session = self.get_object(pk)
+        self.check_target(request, session.target)
+        try:
+            with completed_upload(session) as upload:
+                if session.target == UploadSession.GALLERY:
+                    data = request.data.copy()
+                    data['image'] = upload
+                    serializer = GallerySerializer(data=data)
+                    serializer.is_valid(raise_exception=True)
+                    instance = serializer.save()
+                    location = reverse('gallery_detail', kwargs={'pk': instance.pk})
+                else:
+                    instance = self.get_rental(request)
+                    attach_document(instance, session.filename, upload)
+                    serializer = HardwareRentalSerializer(instance)
+                    location = reverse('hardware_rental_detail', kwargs={'pk': instance.pk})
+        except DjangoValidationError as error:
+            raise ValidationError(error.message_dict)
+        response = Response(serializer.data, status=status.HTTP_201_CREATED)
+        response['Location'] = location
+        return response